@@ -6,4 +6,5 @@ from .ai import (  # noqa: F401
 )
 from .auth import UserDep, init_oauth  # noqa: F401
 from .db import SessionDep, engine  # noqa: F401
+from .http import HttpClientDep, create_http_client  # noqa: F401
 from .settings import Settings, SettingsDep, get_settings  # noqa: F401
@@ -1,18 +1,40 @@
+from functools import lru_cache
 from typing import Annotated
 
+import httpx
 from fastapi import Depends
-from openai import OpenAI
+from openai import DefaultHttpxClient, OpenAI
 
 from app.config.settings import SettingsDep
 
+# Chat streams run concurrently on the threadpool and share this pool; keep
+# enough idle connections around that a new stream rarely needs a handshake
+OPENAI_HTTP_LIMITS = httpx.Limits(
+    max_connections=200, max_keepalive_connections=100, keepalive_expiry=60.0
+)
+# Fail fast on connect, but leave room for slow first tokens
+OPENAI_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+# Concurrent streams are multiplexed over one connection with HTTP/2
+OPENAI_HTTP2_ENABLED = True
 
-def get_openai_client(settings: SettingsDep):
+
+@lru_cache
+def _openai_client(api_key: str, base_url: str) -> OpenAI:
+    # One instance per credentials so its connection pool is reused
     return OpenAI(
-        api_key=settings.OPENAI_API_KEY,
-        base_url=settings.OPENAI_BASE_URL,
+        api_key=api_key,
+        base_url=base_url,
+        timeout=OPENAI_TIMEOUT,
+        http_client=DefaultHttpxClient(
+            limits=OPENAI_HTTP_LIMITS, http2=OPENAI_HTTP2_ENABLED
+        ),
     )
 
 
+def get_openai_client(settings: SettingsDep):
+    return _openai_client(settings.OPENAI_API_KEY, settings.OPENAI_BASE_URL)
+
+
 OpenAIClientDep = Annotated[OpenAI, Depends(get_openai_client)]
 
 # Tool examples: https://github.com/vercel-labs/ai-sdk-preview-python-streaming/blob/main/api/utils/tools.py
@@ -1,6 +1,8 @@
+import time
 from typing import Annotated
 
 from authlib.integrations.starlette_client import OAuth  # type: ignore
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, Request
 
 from app.config.db import SessionDep
@@ -11,9 +13,17 @@ from app.utils.auth import verify_jwt
 
 oauth = OAuth()
 
+GITHUB_API_URL = "https://api.github.com"
+
 JWT_ALG = "HS256"
 JWT_EXP_MINUTES = 60
 
+# Resolved users keyed by access token, so repeated requests skip the DB
+USER_CACHE_SIZE = 10_000
+USER_CACHE_TTL = 30  # seconds
+
+_user_cache: TTLCache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
 
 def init_oauth(settings: Settings) -> None:
     oauth.register(
@@ -24,33 +34,50 @@ def init_oauth(settings: Settings) -> None:
         access_token_params=None,
         authorize_url="https://github.com/login/oauth/authorize",
         authorize_params=None,
-        api_base_url="https://api.github.com",
+        api_base_url=GITHUB_API_URL,
         client_kwargs={"scope": "read:user user:email"},
         server_metadata_url=None,  # GitHub doesn't use OIDC discovery
     )
 
 
-def get_current_user(request: Request, settings: SettingsDep, session: SessionDep):
+def invalidate_cached_user(token: str) -> None:
+    """Forget the user resolved for token (e.g. on logout)."""
+    _user_cache.pop(token, None)
+
+
+async def get_current_user(request: Request, settings: SettingsDep, session: SessionDep):
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
+    # Keyed on the whole token: a bare signature match could be replayed
+    # with a forged payload
+    cached = _user_cache.get(token)
+    if cached is not None:
+        user_created, exp = cached
+        if time.time() < exp:
+            return user_created
+        _user_cache.pop(token, None)
+
     payload = verify_jwt(settings, token, JWT_ALG)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
 
     user_id = payload.get("sub")
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
     assert user.id is not None
-    return UserCreated(
+    user_created = UserCreated(
         id=user.id,
         login=user.login,
         name=user.name,
         avatar_url=user.avatar_url,
     )
+    _user_cache[token] = (user_created, float(payload.get("exp", 0)))
+
+    return user_created
 
 
 UserDep = Annotated[UserCreated, Depends(get_current_user)]
@@ -1,20 +1,57 @@
 from typing import Annotated
 
 from fastapi import Depends
-from sqlmodel import Session, create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.config.settings import get_settings
 
 settings = get_settings()
 
-DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL, echo=settings.ENV == "development", future=True)
-
-
-def get_session():
-    with Session(engine) as session:
+def _ensure_asyncpg_url(database_url: str) -> str:
+    """Ensure the database URL uses the asyncpg driver."""
+    # Migrations keep using psycopg2 (see migrations/env.py); the app is async
+    if "+asyncpg" not in database_url:
+        if database_url.startswith("postgresql://"):
+            database_url = database_url.replace(
+                "postgresql://", "postgresql+asyncpg://", 1
+            )
+        elif "+" in database_url:
+            # Replace any other driver with asyncpg
+            parts = database_url.split("://", 1)
+            if len(parts) == 2:
+                scheme = parts[0].split("+")[0]
+                database_url = f"{scheme}+asyncpg://{parts[1]}"
+    return database_url
+
+
+DATABASE_URL = _ensure_asyncpg_url(settings.DATABASE_URL)
+
+# Pool sized for concurrent chat streams; asyncpg keeps its own per-connection
+# prepared statement cache, and SQLAlchemy caches compiled SQL per engine
+DB_POOL_SIZE = 20
+DB_MAX_OVERFLOW = 40
+# Connections are replaced before the server side can drop them idle, so
+# checkouts skip the pre-ping round-trip
+DB_POOL_RECYCLE = 1800  # seconds
+DB_QUERY_CACHE_SIZE = 1024
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=settings.ENV == "development",
+    future=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=False,
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+)
+
+
+async def get_session():
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
 
 
-SessionDep = Annotated[Session, Depends(get_session)]
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
@@ -0,0 +1,22 @@
+from typing import Annotated
+
+import httpx
+from fastapi import Depends, Request
+
+HTTP_TIMEOUT = 10.0
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 100
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Build the pooled client shared by outbound API calls (see lifespan)."""
+    return httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS),
+    )
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.http_client
+
+
+HttpClientDep = Annotated[httpx.AsyncClient, Depends(get_http_client)]
@@ -0,0 +1,45 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Level used when the root logger has no handlers of its own, matching the
+# stderr fallback logging would otherwise use
+DEFAULT_LOG_LEVEL = logging.WARNING
+
+_listener: Optional[QueueListener] = None
+_root_handlers: list[logging.Handler] = []
+
+
+def start_log_listener() -> None:
+    """Route root log records through a queue so handlers never block the loop.
+
+    The root logger's handlers are moved to a background QueueListener thread
+    and replaced by a QueueHandler, which only enqueues the record.
+    """
+    global _listener, _root_handlers
+    if _listener is not None:
+        return
+
+    root = logging.getLogger()
+    _root_handlers = handlers = list(root.handlers)
+    if not handlers:
+        fallback = logging.StreamHandler()
+        fallback.setLevel(DEFAULT_LOG_LEVEL)
+        handlers = [fallback]
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    _listener.start()
+
+
+def stop_log_listener() -> None:
+    """Flush queued records and give the root logger its handlers back."""
+    global _listener
+    if _listener is None:
+        return
+
+    _listener.stop()
+    logging.getLogger().handlers = _root_handlers
+    _listener = None
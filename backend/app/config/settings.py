@@ -11,6 +11,10 @@ class Settings(BaseSettings):
     # Environment Configuration
     ENV: Literal["development", "production"] = "development"
 
+    # Server Configuration
+    # Worker threads available to sync endpoints/dependencies (AnyIO default: 40)
+    THREADPOOL_SIZE: int = 100
+
     # CORS Configuration
     FRONTEND_URL: str = "http://localhost:3000"
 
@@ -28,6 +32,9 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = "sk-****"
     OPENAI_BASE_URL: str = "https://openai-compatible-ai-provider-base-url"
     OPENAI_MODEL: str = "model-name"
+    # Replay the stored answer when the exact same prompt (history + retrieved
+    # context) is sent again, instead of calling the model
+    RESPONSE_CACHE_ENABLED: bool = True
 
     # RAG / ingestion settings
     # Provide a comma-separated list of URLs to ingest on startup, or leave blank.
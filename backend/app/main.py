@@ -1,34 +1,93 @@
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
 import logging
 
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.sessions import SessionMiddleware
 
+from .config.http import create_http_client
+from .config.log import start_log_listener, stop_log_listener
 from .config.settings import get_settings
 from .routers import auth, chat, health, report
-from .services.embedding import chroma_db_populated, create_vector_store
+from .services.embedding import (
+    chroma_db_populated,
+    create_vector_store,
+    warm_vectorstore,
+)
+from .services.persistence import start_persist_worker, stop_persist_worker
+from .services.scraper import close_scrape_client, shutdown_pdf_executor
+
 
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
 
+def _log_ingest_failure(task: asyncio.Task) -> None:
+    """Log an ingestion failure as soon as it happens, not only on /health/ready."""
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.exception("Startup ingestion failed", exc_info=exc)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Lifespan handler: optional ingestion on startup using settings."""
+    """Lifespan handler: shared clients, persistence worker and optional ingestion."""
+
+    start_log_listener()
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = settings.THREADPOOL_SIZE
 
+    app.state.http_client = create_http_client()
+
+    persist_worker = start_persist_worker()
+    app.state.persist_worker = persist_worker
+
+    # Ingestion runs in the background so the server accepts traffic right away;
+    # its progress is reported by /health/ready
+    app.state.ingest_task = None
     if settings.INGEST_ON_STARTUP:
         base_url = settings.INGEST_BASE_URL
 
         if base_url:
             if not chroma_db_populated() or settings.INGEST_FORCE:
-                await create_vector_store(base_url)
-                
+                app.state.ingest_task = asyncio.create_task(
+                    create_vector_store(base_url, force=settings.INGEST_FORCE)
+                )
+                app.state.ingest_task.add_done_callback(_log_ingest_failure)
+
+    # Load an existing index now so the first chat request doesn't pay for it
+    if app.state.ingest_task is None and chroma_db_populated():
+        try:
+            await asyncio.to_thread(warm_vectorstore)
+        except Exception as e:
+            logger.warning(f"Could not preload the vectorstore: {e}")
 
     yield
 
+    # Wait for the cancelled ingestion to unwind, so the ingest state and
+    # Chroma handles are closed before the PDF executor goes away (a failure
+    # while unwinding is already logged by _log_ingest_failure)
+    if app.state.ingest_task is not None and not app.state.ingest_task.done():
+        app.state.ingest_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await app.state.ingest_task
+
+    await stop_persist_worker(persist_worker)
+    await app.state.http_client.aclose()
+    await close_scrape_client()
+    shutdown_pdf_executor()
+    stop_log_listener()
+
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Session middleware is required for OAuth state management
 app.add_middleware(
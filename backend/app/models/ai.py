@@ -1,16 +1,40 @@
+import os
+import time
 import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlmodel import JSON, Column, Field, SQLModel
+from sqlalchemy import Computed
+from sqlmodel import (
+    JSON,
+    Column,
+    Field,
+    Index,
+    SQLModel,
+    String,
+    UniqueConstraint,
+    col,
+)
+
+
+def uuid7() -> uuid.UUID:
+    """Return a time-ordered UUID (RFC 9562 version 7).
+
+    The leading 48 bits hold the Unix time in milliseconds, so ids generated
+    later sort after earlier ones and B-tree inserts stay append-mostly.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # variant
+    return uuid.UUID(int=value)
 
 
 class Chat(SQLModel, table=True):
-    id: Optional[str] = Field(
-        default_factory=lambda: str(uuid.uuid4()), primary_key=True
-    )
+    id: Optional[str] = Field(default_factory=lambda: str(uuid7()), primary_key=True)
     title: Optional[str] = None
-    user_id: int = Field(foreign_key="user.id", index=True)
+    user_id: int = Field(foreign_key="user.id")
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     changed_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -19,10 +43,33 @@ class Chat(SQLModel, table=True):
 
 
 class Message(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("chat_id", "msg_id", name="uq_message_chat_id_msg_id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     chat_id: str = Field(foreign_key="chat.id", index=True)
+    msg_id: Optional[str] = None  # UIMessage id, stable across saves
     user_id: int = Field(foreign_key="user.id")
-    role: Optional[str] = Field(default=None, index=True)
-    content: Optional[str] = None
+    # Derived from data by Postgres, never written by the application
+    role: Optional[str] = Field(
+        default=None,
+        sa_column=Column(
+            String, Computed("data->>'role'", persisted=True), index=True
+        ),
+    )
     data: dict = Field(sa_column=Column(JSON))  # Vercel AI SDK UIMessage format
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+# Serves the per-user chat listing.
+Index(
+    "ix_chat_user_id_created_at",
+    col(Chat.user_id),
+    col(Chat.created_at).desc(),
+)
+
+# Serves the "latest message per chat" lookup used by chat listings.
+Index(
+    "ix_message_chat_id_created_at",
+    col(Message.chat_id),
+    col(Message.created_at).desc(),
+)
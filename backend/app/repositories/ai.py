@@ -1,23 +1,27 @@
 """Utilities for chat persistence."""
 
-from typing import Any, List
+import uuid
+from datetime import datetime, timezone
+from typing import Any, List, Sequence
 
-from sqlmodel import col, delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
+from sqlmodel import col, delete, func, select
 
 from ..config.db import SessionDep
 from ..models import Chat, Message
 
 
-def create_chat(session: SessionDep, user_id: int):
+async def create_chat(session: SessionDep, user_id: int):
     """Create a new chat and return its ID."""
     chat = Chat(user_id=user_id)
     session.add(chat)
-    session.commit()
-    session.refresh(chat)
+    await session.commit()
+    await session.refresh(chat)
     return chat.id
 
 
-def load_chat(
+async def load_chat(
     session: SessionDep,
     chat_id: str,
     user_id: int,
@@ -27,7 +31,7 @@ def load_chat(
     Returns a list of UIMessage-compatible dictionaries.
     """
     # Verify chat belongs to user
-    chat = session.get(Chat, chat_id)
+    chat = await session.get(Chat, chat_id)
     if not chat or chat.user_id != user_id:
         raise ValueError(f"Chat {chat_id} not found or access denied")
 
@@ -35,9 +39,9 @@ def load_chat(
     statement = (
         select(Message)
         .where(Message.chat_id == chat_id)
-        .order_by(col(Message.created_at).asc())
+        .order_by(col(Message.created_at).asc(), col(Message.id).asc())
     )
-    result = session.exec(statement)
+    result = await session.exec(statement)
     db_messages = list(result.all())
 
     # Convert to UIMessage format
@@ -47,7 +51,19 @@ def load_chat(
 
     return ui_messages, chat
 
-def save_chat(
+
+def _extract_content(msg_data: dict[str, Any]) -> str:
+    """Return the plain text of a UIMessage."""
+    if "parts" in msg_data:
+        return "".join(
+            part.get("text", "")
+            for part in msg_data["parts"]
+            if part.get("type") == "text"
+        )
+    return msg_data.get("content", "")
+
+
+async def save_chat(
     session: SessionDep,
     chat_id: str,
     user_id: int,
@@ -56,44 +72,89 @@ def save_chat(
     """
     Save chat messages to database.
     messages should be in UIMessage format (list of dictionaries).
+    Messages already stored for the chat (matched by their UIMessage id) are
+    left untouched, so callers only need to pass the newly appended ones.
     """
     # Verify chat belongs to user
-    chat = session.get(Chat, chat_id)
+    chat = await session.get(Chat, chat_id)
     if not chat or chat.user_id != user_id:
         raise ValueError(f"Chat {chat_id} not found or access denied")
 
-    # Delete existing messages for this chat
-    delete_messages = delete(Message).where(col(Message.chat_id) == chat_id)
-    session.exec(delete_messages)
-
-    # Save new messages
-    for msg_data in messages:
-        # Extract role and content for legacy fields
-        role = msg_data.get("role", "user")
-        content = ""
-        if "parts" in msg_data:
-            text_parts = [
-                part.get("text", "")
-                for part in msg_data["parts"]
-                if part.get("type") == "text"
-            ]
-            content = "".join(text_parts)
-        elif "content" in msg_data:
-            content = msg_data["content"]
-
-        message = Message(
-            chat_id=chat_id,
-            user_id=user_id,
-            data=msg_data,
-            role=role,
-            content=content,
+    if not messages:
+        return
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "chat_id": chat_id,
+            "msg_id": msg_data.get("id") or f"msg-{uuid.uuid4().hex[:16]}",
+            "user_id": user_id,
+            "data": msg_data,
+            "created_at": now,
+        }
+        for msg_data in messages
+    ]
+
+    # Append-only: skip messages persisted by a previous turn
+    statement = (
+        pg_insert(Message)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["chat_id", "msg_id"])
+    )
+    await session.exec(statement)
+    await session.commit()
+
+
+async def save_chats_bulk(
+    session: SessionDep,
+    items: Sequence[tuple[str, int, List[dict[str, Any]]]],
+) -> List[str]:
+    """
+    Save the messages of several chats with one INSERT and one commit.
+    items are (chat_id, user_id, messages) tuples, as taken by save_chat.
+    Items whose chat doesn't exist or belongs to another user are skipped;
+    their chat ids are returned.
+    """
+    chat_ids = {chat_id for chat_id, _, _ in items}
+    owners = dict(
+        (
+            await session.exec(
+                select(Chat.id, Chat.user_id).where(col(Chat.id).in_(chat_ids))
+            )
+        ).all()
+    )
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    rejected = []
+    for chat_id, user_id, messages in items:
+        if owners.get(chat_id) != user_id:
+            rejected.append(chat_id)
+            continue
+        rows.extend(
+            {
+                "chat_id": chat_id,
+                "msg_id": msg_data.get("id") or f"msg-{uuid.uuid4().hex[:16]}",
+                "user_id": user_id,
+                "data": msg_data,
+                "created_at": now,
+            }
+            for msg_data in messages
         )
-        session.add(message)
 
-    session.commit()
+    if rows:
+        statement = (
+            pg_insert(Message)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["chat_id", "msg_id"])
+        )
+        await session.exec(statement)
+        await session.commit()
+
+    return rejected
 
 
-def add_chat_title(
+async def add_chat_title(
     session: SessionDep,
     chat_id: str,
     user_id: int,
@@ -101,48 +162,57 @@ def add_chat_title(
 ):
     """Add or update the title of a chat."""
     # Verify chat belongs to user
-    chat = session.get(Chat, chat_id)
+    chat = await session.get(Chat, chat_id)
     if not chat or chat.user_id != user_id:
         raise ValueError(f"Chat {chat_id} not found or access denied")
 
     chat.title = title
     session.add(chat)
-    session.commit()
+    await session.commit()
 
-def list_chats(
+async def list_chats(
     session: SessionDep,
     user_id: int,
     limit: int | None = None,
 ) -> List[dict[str, Any]]:
     """Return chat summaries for a user ordered by recent activity."""
 
+    # Latest message per chat, resolved in a single pass with DISTINCT ON;
+    # filtered here too, since the outer user filter isn't pushed into it
+    latest_subquery = (
+        select(Message)
+        .where(Message.user_id == user_id)
+        .distinct(col(Message.chat_id))
+        .order_by(
+            col(Message.chat_id),
+            col(Message.created_at).desc(),
+            col(Message.id).desc(),
+        )
+        .subquery()
+    )
+    latest_message = aliased(Message, latest_subquery)
+    updated_at = func.coalesce(latest_message.created_at, Chat.created_at)
+
     statement = (
-        select(Chat)
+        select(Chat, latest_message)
+        .outerjoin(latest_message, col(Chat.id) == latest_message.chat_id)
         .where(Chat.user_id == user_id)
-        .order_by(col(Chat.created_at).desc())
+        .order_by(updated_at.desc())
     )
 
     if limit:
         statement = statement.limit(limit)
 
-    chats = session.exec(statement).all()
+    rows = (await session.exec(statement)).all()
 
     summaries: List[dict[str, Any]] = []
-    for chat in chats:
-        last_message_statement = (
-            select(Message)
-            .where(Message.chat_id == chat.id)
-            .order_by(col(Message.created_at).desc())
-            .limit(1)
-        )
-        last_message = session.exec(last_message_statement).first()
-
+    for chat, last_message in rows:
         preview = ""
         last_role = None
         updated_at = chat.created_at
 
         if last_message is not None:
-            preview = last_message.content or ""
+            preview = _extract_content(last_message.data or {})
             last_role = last_message.role
             updated_at = last_message.created_at
 
@@ -156,12 +226,10 @@ def list_chats(
             }
         )
 
-    summaries.sort(key=lambda item: item["updated_at"], reverse=True)
-
     return summaries
 
 
-def delete_chat(
+async def delete_chat(
     session: SessionDep,
     chat_id: str,
     user_id: int,
@@ -171,14 +239,14 @@ def delete_chat(
     Raises ValueError if chat not found or access denied.
     """
     # Verify chat belongs to user
-    chat = session.get(Chat, chat_id)
+    chat = await session.get(Chat, chat_id)
     if not chat or chat.user_id != user_id:
         raise ValueError(f"Chat {chat_id} not found or access denied")
 
     # Delete messages first (due to foreign key constraint)
     delete_messages = delete(Message).where(col(Message.chat_id) == chat_id)
-    session.exec(delete_messages)
+    await session.exec(delete_messages)
 
     # Delete the chat
-    session.delete(chat)
-    session.commit()
+    await session.delete(chat)
+    await session.commit()
@@ -4,13 +4,13 @@ from app.config.db import SessionDep
 from app.models import User
 
 
-def get_or_create_user(
+async def get_or_create_user(
     session: SessionDep,
     user_info: dict,
 ):
     # Check if user with this login already exists
     user_statement = select(User).where(User.github_id == user_info["id"])
-    user = session.exec(user_statement).first()
+    user = (await session.exec(user_statement)).first()
 
     if user:
         # User exists
@@ -24,7 +24,7 @@ def get_or_create_user(
         github_id=user_info["id"],
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     return user
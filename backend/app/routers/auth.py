@@ -1,9 +1,19 @@
+import asyncio
+
 from fastapi import APIRouter
 from fastapi.responses import RedirectResponse
 from starlette.requests import Request
 
-from ..config.auth import JWT_ALG, JWT_EXP_MINUTES, UserDep, oauth
+from ..config.auth import (
+    GITHUB_API_URL,
+    JWT_ALG,
+    JWT_EXP_MINUTES,
+    UserDep,
+    invalidate_cached_user,
+    oauth,
+)
 from ..config.db import SessionDep
+from ..config.http import HttpClientDep
 from ..config.settings import SettingsDep
 from ..repositories.auth import get_or_create_user
 from ..schemas.auth import UserCreated
@@ -36,7 +46,12 @@ async def github_login(request: Request):
 
 
 @router.get("/github/callback")
-async def github_callback(request: Request, settings: SettingsDep, session: SessionDep):
+async def github_callback(
+    request: Request,
+    settings: SettingsDep,
+    session: SessionDep,
+    http_client: HttpClientDep,
+):
     """Handle GitHub OAuth callback but redirect to frontend with token in querystring.
 
     This route does NOT set the cookie on the backend. Instead it redirects the
@@ -44,12 +59,23 @@ async def github_callback(request: Request, settings: SettingsDep, session: Sess
     persist the token as a cookie from the frontend server code.
     """
     token = await oauth.github.authorize_access_token(request)
-    resp = await oauth.github.get("user", token=token)
+    # Fetch the profile over the shared pooled client instead of a fresh
+    # per-call authlib client
+    resp = await http_client.get(
+        f"{GITHUB_API_URL}/user",
+        headers={
+            "Authorization": f"Bearer {token['access_token']}",
+            "Accept": "application/vnd.github+json",
+        },
+    )
     resp.raise_for_status()
     user_info = resp.json()
 
-    user = get_or_create_user(session, user_info)
-    access_token = create_jwt(settings, str(user.id), JWT_ALG, JWT_EXP_MINUTES)
+    user = await get_or_create_user(session, user_info)
+    # Sign off the event loop so concurrent logins don't queue behind it
+    access_token = await asyncio.to_thread(
+        create_jwt, settings, str(user.id), JWT_ALG, JWT_EXP_MINUTES
+    )
 
     # Redirect to frontend route that will set the cookie on the client side
     redirect_url = f"{settings.FRONTEND_URL}/api/set-cookie-client?token={access_token}"
@@ -58,10 +84,15 @@ async def github_callback(request: Request, settings: SettingsDep, session: Sess
 
 @router.get("/logout")
 async def logout(
+    request: Request,
     _session: SessionDep,
     settings: SettingsDep,
 ):
     """Logout user by clearing the JWT cookie."""
+    token = request.cookies.get("access_token")
+    if token:
+        invalidate_cached_user(token)
+
     resp = RedirectResponse(url=settings.FRONTEND_URL)
     delete_jwt_cookie(resp)
     return resp
@@ -1,3 +1,5 @@
+import itertools
+import logging
 import uuid
 from datetime import datetime
 from typing import Any, List, Optional
@@ -12,16 +14,22 @@ from ..config.auth import UserDep
 from ..config.db import SessionDep
 from ..config.settings import SettingsDep
 from ..repositories.ai import add_chat_title, create_chat, list_chats, load_chat, delete_chat
-from ..schemas.ai import ClientMessage, ClientMessagePart
+from ..schemas.ai import ClientMessage
 from ..utils.ai import (
     build_title_from_query,
+    convert_history_to_openai_messages,
     convert_to_openai_messages,
+    invalidate_converted_messages,
     patch_response_with_headers,
+    ui_to_client_message,
     stream_text,
     stream_text_with_persistence,
     build_context_message_from_documents,
 )
-from ..services.embedding import retrieve_docs
+from ..services.embedding import first_user_text, retrieve_docs
+
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -46,6 +54,9 @@ async def handle_chat_data(
     # Handle chat persistence
     chat_id = request.id
     previous_messages: List[dict[str, Any]] = []
+    # Stored messages the conversion cache already covered; they aren't in
+    # `messages`, which then only holds the tail of the conversation
+    earlier_messages: List[dict[str, Any]] = []
 
     # Find the user query text (prefer request.message if present)
     user_query_text = ""
@@ -55,39 +66,26 @@ async def handle_chat_data(
     if chat_id:
         # Load previous messages
         try:
-            previous_messages, chat = load_chat(session, chat_id, user.id)
+            previous_messages, chat = await load_chat(session, chat_id, user.id)
         except ValueError as e:
             raise HTTPException(status_code=404, detail=str(e))
 
         if not chat.title:
             title = build_title_from_query(client, user_query_text)
-            add_chat_title(session, chat_id, user.id, title)
-
-        # Convert to ClientMessage format for processing
-        client_messages = []
-        for msg in previous_messages:
-            # Convert UIMessage format back to ClientMessage
-            role = msg.get("role", "user")
-            parts_data = msg.get("parts", [])
-            content = ""
-
-            # Convert parts to ClientMessagePart objects
-            parts = []
-            for part_data in parts_data:
-                if part_data.get("type") == "text":
-                    text = part_data.get("text", "")
-                    content += text
-                    parts.append(ClientMessagePart(type="text", text=text))
-
-            client_messages.append(
-                ClientMessage(
-                    role=role, content=content, parts=parts if parts else None
-                )
-            )
+            await add_chat_title(session, chat_id, user.id, title)
+
+        # Only the history persisted since the previous turn is converted
+        client_messages, openai_messages = convert_history_to_openai_messages(
+            chat_id, previous_messages
+        )
+        earlier_messages = previous_messages[
+            : len(previous_messages) - len(client_messages)
+        ]
 
         # Append new message if provided
         if request.message:
             client_messages.append(request.message)
+            openai_messages += convert_to_openai_messages([request.message])
 
         messages = client_messages
     else:
@@ -99,24 +97,34 @@ async def handle_chat_data(
         else:
             messages = []
 
-    openai_messages = convert_to_openai_messages(messages)
-
+        openai_messages = convert_to_openai_messages(messages)
 
     # RAG
-    # Pass explicit user query text to retrieve_docs to avoid ambiguity about message order
+    # Resolve the query once here so retrieval doesn't rescan the history;
+    # older stored messages are converted only if the tail has no user text
+    if not user_query_text:
+        user_query_text = first_user_text(
+            itertools.chain(
+                reversed(messages),
+                map(ui_to_client_message, reversed(earlier_messages)),
+            )
+        )
     docs = retrieve_docs(messages, 7, query=user_query_text)
     context_msg = build_context_message_from_documents(docs, 10_000)
     openai_messages = [context_msg] + openai_messages
 
+    # A lone question's answer depends only on the question, so the same
+    # user's paraphrases can share it; with history the exact-prompt cache is
+    # the only one used.
+    # An answer given without context (e.g. retrieval failed) isn't shared
+    conversation_length = len(earlier_messages) + len(messages)
+    cache_query = user_query_text if conversation_length == 1 and docs else None
+
     # Track messages for persistence if chat_id is provided
+    # Only the new turn is stored; previous messages are already persisted
     ui_messages = []
     if chat_id:
-        # Convert client messages to UIMessage format for storage
-        # When loading from DB, messages already have IDs
-        if previous_messages:
-            ui_messages = previous_messages[:]
-
-        # Add the new user message if provided
+        # Convert the new user message to UIMessage format for storage
         if request.message:
             msg_dict: dict[str, Any] = {
                 "id": f"msg-{uuid.uuid4().hex[:16]}",
@@ -145,6 +153,7 @@ async def handle_chat_data(
                 chat_id,
                 user.id,
                 background_tasks,
+                cache_query=cache_query,
             ),
             media_type="text/event-stream",
         )
@@ -158,6 +167,8 @@ async def handle_chat_data(
                 AVAILABLE_TOOLS,
                 settings.OPENAI_MODEL,
                 protocol,
+                cache_query=cache_query,
+                user_id=user.id,
             ),
             media_type="text/event-stream",
         )
@@ -175,8 +186,8 @@ async def create_new_chat(
     user: UserDep,
 ):
     """Create a new chat and return its ID."""
-    print(f"---- Creating new chat for user {user.id}")
-    chat_id = create_chat(session, user.id)
+    logger.debug(f"Creating new chat for user {user.id}")
+    chat_id = await create_chat(session, user.id)
     return CreateNewChatResponse(id=chat_id)
 
 
@@ -205,7 +216,7 @@ async def get_user_chats(
 ):
     """Return chat summaries for the authenticated user."""
 
-    summaries = list_chats(session, user.id, limit)
+    summaries = await list_chats(session, user.id, limit)
     return ListChatsResponse(
         chats=[
             ChatSummary(
@@ -228,7 +239,7 @@ async def get_chat_messages(
 ):
     """Load chat messages by chat ID."""
     try:
-        messages, _ = load_chat(session, chat_id, user.id)
+        messages, _ = await load_chat(session, chat_id, user.id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     return GetChatMessagesResponse(id=chat_id, messages=messages)
@@ -242,7 +253,8 @@ async def delete_chat_endpoint(
 ):
     """Delete a chat and all its messages."""
     try:
-        delete_chat(session, chat_id, user.id)
+        await delete_chat(session, chat_id, user.id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    invalidate_converted_messages(chat_id)
     return {"message": "Chat deleted successfully"}
@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -6,3 +7,25 @@ router = APIRouter(prefix="/health", tags=["health"])
 @router.get("")
 def health():
     return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready(request: Request):
+    """Report whether startup ingestion of the vector store has finished."""
+    task = getattr(request.app.state, "ingest_task", None)
+
+    if task is None:
+        ingestion = "idle"
+    elif not task.done():
+        # Still ingesting: retrieval would run against an incomplete store
+        return JSONResponse(
+            status_code=503, content={"status": "starting", "ingestion": "running"}
+        )
+    elif task.cancelled():
+        ingestion = "cancelled"
+    elif task.exception() is not None:
+        ingestion = "failed"
+    else:
+        ingestion = "done"
+
+    return {"status": "ok", "ingestion": ingestion}
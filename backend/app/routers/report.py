@@ -1,23 +1,51 @@
+import hashlib
 import os
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from fastapi.responses import FileResponse
 
 router = APIRouter(prefix="/report", tags=["report"])
 
 FILE_DIRECTORY = "static"
+REPORT_PATH = os.path.join(FILE_DIRECTORY, "report.pdf")
+REPORT_MAX_AGE = 3600  # seconds
+
+# The report ships with the image, so its stat and ETag are computed once
+_file_info: dict[str, tuple[os.stat_result, str]] = {}
+
+
+def _get_file_info(path: str) -> tuple[os.stat_result, str]:
+    info = _file_info.get(path)
+    if info is None:
+        stat_result = os.stat(path)
+        digest = hashlib.md5(
+            f"{stat_result.st_mtime_ns}-{stat_result.st_size}".encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        info = _file_info[path] = (stat_result, f'"{digest}"')
+    return info
 
 
 @router.get("")
-async def generate_report():
+async def generate_report(request: Request):
     """Generate and return a report."""
 
-    headers = {"Content-Disposition": 'inline; filename="report.pdf"'}
+    stat_result, etag = _get_file_info(REPORT_PATH)
+
+    headers = {
+        "Content-Disposition": 'inline; filename="report.pdf"',
+        "Cache-Control": f"public, max-age={REPORT_MAX_AGE}",
+        "ETag": etag,
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
 
     res = FileResponse(
-        path=os.path.join(FILE_DIRECTORY, "report.pdf"),
+        path=REPORT_PATH,
         media_type="application/pdf",
         filename="report.pdf",
-        headers=headers
+        headers=headers,
+        stat_result=stat_result,
     )
 
     return res
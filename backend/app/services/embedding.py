@@ -1,6 +1,16 @@
+import asyncio
+import hashlib
+import logging
 import os
-from typing import List, Optional
-
+import random
+import sqlite3
+import threading
+import uuid
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+import httpx
+from cachetools import TTLCache
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
@@ -8,41 +18,182 @@ from langchain_openai import OpenAIEmbeddings
 
 from ..schemas.ai import ClientMessage
 from ..config.settings import get_settings
-from .scraper import scrape, CrawlStrategy
+from .scraper import scrape, CrawlStrategy, ScrapeResult
 from .query_rewriter import get_query_rewriter, RewriteStrategy
 
 
-CHROMA_DB_PATH = "./chroma_db"
-
-
-def _get_chunks(text: str) -> list[str]:
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1024,
-        chunk_overlap=300,
-        separators=["\n\n", "\n", " ", ""],
-        length_function=len,
-    )
-
-    return text_splitter.split_text(text)
+logger = logging.getLogger(__name__)
 
+CHROMA_DB_PATH = "./chroma_db"
 
+# Retrieval results keyed by (query hash, k, rewriting options)
+RETRIEVAL_CACHE_SIZE = 1024
+RETRIEVAL_CACHE_TTL = 300  # seconds
+
+_retrieval_cache: TTLCache = TTLCache(
+    maxsize=RETRIEVAL_CACHE_SIZE, ttl=RETRIEVAL_CACHE_TTL
+)
+_retrieval_cache_lock = threading.Lock()
+
+# Embeddings of user questions keyed by query hash, shared by retrieval and
+# the semantic response cache
+_query_vector_cache: TTLCache = TTLCache(
+    maxsize=RETRIEVAL_CACHE_SIZE, ttl=RETRIEVAL_CACHE_TTL
+)
+
+# Ingestion batching
+EMBED_BATCH_SIZE = 512
+EMBED_MAX_CONCURRENCY = 8
+EMBED_REQUEST_JITTER = 0.05  # seconds
+CHROMA_ADD_BATCH_SIZE = 1000
+EMBED_HTTP_KEEPALIVE = 32  # matches EMBED_MAX_CONCURRENCY with headroom
+
+# Ingestion pipeline (scrape -> chunk -> embed)
+INGEST_SCRAPE_QUEUE_SIZE = 32
+INGEST_CHUNK_QUEUE_SIZE = 64
+INGEST_EMBED_WORKERS = 2
+INGEST_BATCH_TIMEOUT = 0.5  # seconds
+
+
+# Per-URL cache validators and content hash from the last ingest; kept inside
+# the Chroma directory so both are wiped together
+INGEST_STATE_PATH = os.path.join(CHROMA_DB_PATH, "ingest_state.sqlite3")
+
+# Chunking
+CHUNK_SIZE = 1024
+CHUNK_OVERLAP = 300
+
+# Built once; splitting is stateless so the instance is shared by all callers
+_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    separators=["\n\n", "\n", " ", ""],
+    length_function=len,
+)
+
+
+@lru_cache(maxsize=1)
 def _get_embeddings() -> OpenAIEmbeddings:
+    """Shared embeddings client for ingestion and retrieval.
+
+    Built once so both paths reuse the same HTTP connection pool instead of
+    reconnecting to OpenAI on every call.
+    """
     settings = get_settings()
     api_key = settings.OPENAI_API_KEY
 
-    return OpenAIEmbeddings(model="text-embedding-3-small", api_key=api_key)  # type: ignore
+    limits = httpx.Limits(max_keepalive_connections=EMBED_HTTP_KEEPALIVE)
+    return OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        api_key=api_key,  # type: ignore
+        # One HTTP request per _embed_texts batch
+        chunk_size=EMBED_BATCH_SIZE,
+        # Sync client serves retrieval, async client serves ingestion
+        http_client=httpx.Client(limits=limits),
+        http_async_client=httpx.AsyncClient(limits=limits),
+    )
 
 
+@lru_cache(maxsize=1)
 def _get_vectorstore() -> Chroma:
     """Load the persisted Chroma vectorstore. If it doesn't exist, this will create a new handle.
 
     Returns a Chroma instance wired with the same embeddings used during ingestion.
+    The handle is opened lazily on first retrieval and reused afterwards.
     """
     embeddings = _get_embeddings()
 
     return Chroma(persist_directory=CHROMA_DB_PATH, embedding_function=embeddings)
 
 
+class _IngestState:
+    """SQLite record of each ingested URL's validators and content hash."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT NOT NULL)"
+        )
+
+    def get(self, url: str) -> Optional[tuple[Optional[str], Optional[str], str]]:
+        return self._conn.execute(
+            "SELECT etag, last_modified, content_hash FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+
+    def save(
+        self, pages: dict[str, tuple[Optional[str], Optional[str], str]]
+    ) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash) "
+            "VALUES (?, ?, ?, ?)",
+            [(url, *page) for url, page in pages.items()],
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _chroma_collection(vectorstore: Chroma):
+    """The Chroma collection behind vectorstore.
+
+    langchain-chroma (1.0.0 in uv.lock) has no public API to query several
+    vectors in one call or to add precomputed embeddings, so those two go
+    through its private _collection attribute, only via this helper. Recheck
+    it when upgrading langchain-chroma.
+    """
+    return vectorstore._collection
+
+
+def warm_vectorstore() -> None:
+    """Open the vectorstore handle ahead of the first retrieval."""
+    _get_vectorstore()
+
+
+def extract_last_user_text(msgs: list[ClientMessage]) -> str:
+    """Return the text of the most recent user message ("" if there is none).
+
+    Scans from the end and stops at the first user message with text.
+    """
+    return first_user_text(reversed(msgs))
+
+
+def first_user_text(msgs_newest_first: Iterable[ClientMessage]) -> str:
+    """extract_last_user_text for messages already ordered newest first.
+
+    Stops at the first match, so a lazily converted history is only converted
+    as far back as needed.
+    """
+    for msg in msgs_newest_first:
+        if msg.role == "user":
+            if isinstance(msg.content, str):
+                return msg.content
+            elif isinstance(msg.content, list):
+                text_part = next((p.text for p in msg.content if p.type == "text"), None)  # type: ignore
+                if text_part:
+                    return text_part
+    return ""
+
+
+def _query_hash(query: str) -> str:
+    normalized_query = " ".join(query.lower().split())
+    return hashlib.blake2b(normalized_query.encode(), digest_size=16).hexdigest()
+
+
+def embed_query(query: str) -> List[float]:
+    """Embedding of a user question, reusing the one retrieve_docs computed."""
+    query_hash = _query_hash(query)
+    with _retrieval_cache_lock:
+        vector = _query_vector_cache.get(query_hash)
+    if vector is None:
+        vector = _get_embeddings().embed_query(query)
+        with _retrieval_cache_lock:
+            _query_vector_cache[query_hash] = vector
+    return vector
+
+
 def retrieve_docs(
     msgs: list[ClientMessage],
     k: int = 5,
@@ -53,97 +204,309 @@ def retrieve_docs(
     """Return the top-k documents from the vectorstore for a given query.
 
     This is a thin wrapper so callers (routers/services) can easily fetch
-    relevant chunks to be used as context for generation.
+    relevant chunks to be used as context for generation. Results are cached
+    for RETRIEVAL_CACHE_TTL seconds per normalized query and k.
     """
-    vectorstore = _get_vectorstore()
-
     # If an explicit query was provided, use it; otherwise extract from messages
     if query and isinstance(query, str) and query.strip():
         selected_query = query
     else:
-        selected_query = ""
-        for msg in reversed(msgs):
-            if msg.role == "user":
-                if isinstance(msg.content, str):
-                    selected_query = msg.content
-                    break
-                elif isinstance(msg.content, list):
-                    text_part = next((p.text for p in msg.content if p.type == "text"), None)  # type: ignore
-                    if text_part:
-                        selected_query = text_part
-                        break
+        selected_query = extract_last_user_text(msgs)
         if not selected_query:
             selected_query = "Vestibular Unicamp 2026"  # dummy query
 
+    query_hash = _query_hash(selected_query)
+    cache_key = (query_hash, k, use_query_rewriting, rewrite_strategy)
+
+    with _retrieval_cache_lock:
+        cached = _retrieval_cache.get(cache_key)
+    if cached is not None:
+        return [
+            Document(page_content=content, metadata=dict(metadata))
+            for content, metadata in cached
+        ]
+
+    vectorstore = _get_vectorstore()
+
     # Apply query rewriting if enabled
     queries_to_search = [selected_query]
     if use_query_rewriting:
         rewriter = get_query_rewriter()
-        rewriter.rewrite(selected_query, strategy=rewrite_strategy)
+        queries_to_search = rewriter.rewrite(selected_query, strategy=rewrite_strategy)
 
-    # Perform similarity search with original query
-    # Then collect additional results from rewritten queries
-    all_docs = {}  # Use dict to deduplicate by content
-    doc_scores = {}  # Track best score for each document
+    all_docs: dict[tuple, Document] = {}  # Deduplicate by source + content hash
+    doc_scores: dict[tuple, float] = {}  # Track best score for each document
 
-    for search_query in queries_to_search:
-        try:
-            # Get results for this query variation
-            results = vectorstore.similarity_search_with_score(search_query, k=k)
+    try:
+        # Embed every query variation in one request and search them all in a
+        # single batched collection query
+        query_vectors = _get_embeddings().embed_documents(queries_to_search)
+        if selected_query in queries_to_search:
+            with _retrieval_cache_lock:
+                _query_vector_cache[query_hash] = query_vectors[
+                    queries_to_search.index(selected_query)
+                ]
+        results = _chroma_collection(vectorstore).query(
+            query_embeddings=query_vectors,  # type: ignore
+            n_results=k,
+            include=["documents", "metadatas", "distances"],  # type: ignore
+        )
 
-            for doc, score in results:
-                # Use page content as key for deduplication
-                doc_key = doc.page_content[:100]  # Use first 100 chars as key
+        for contents, metadatas, ids, distances in zip(
+            results["documents"] or [],
+            results["metadatas"] or [],
+            results["ids"],
+            results["distances"] or [],
+        ):
+            for content, metadata, doc_id, score in zip(
+                contents, metadatas, ids, distances
+            ):
+                if content is None:
+                    continue
+
+                doc_key = (
+                    (metadata or {}).get("source_url"),
+                    hashlib.blake2b(content.encode(), digest_size=16).digest(),
+                )
 
                 # Keep the document with the best (lowest) score
                 if doc_key not in doc_scores or score < doc_scores[doc_key]:
-                    all_docs[doc_key] = doc
+                    all_docs[doc_key] = Document(
+                        page_content=content, metadata=dict(metadata or {}), id=doc_id
+                    )
                     doc_scores[doc_key] = score
 
-        except Exception:
-            continue
+    except Exception:
+        # Not cached: a transient failure shouldn't read as "no documents"
+        logger.exception("Error searching the vectorstore")
+        return []
 
     # Sort by score and return top k
     sorted_docs = sorted(
-        [(doc, score) for doc, score in zip(all_docs.values(), doc_scores.values())],
+        ((doc, doc_scores[key]) for key, doc in all_docs.items()),
         key=lambda x: x[1],
     )
 
-    result = [doc for doc, _ in sorted_docs[:k]]
+    # Expose the distance so callers can budget context best-first
+    result = []
+    for doc, score in sorted_docs[:k]:
+        doc.metadata["score"] = float(score)
+        result.append(doc)
+
+    # Freeze to plain tuples so cached entries stay small and immutable
+    with _retrieval_cache_lock:
+        _retrieval_cache[cache_key] = tuple(
+            (doc.page_content, tuple(doc.metadata.items())) for doc in result
+        )
 
     return result
 
 
-async def create_vector_store(base_url: str) -> Chroma:
+async def _embed_texts(
+    embeddings: OpenAIEmbeddings, texts: list[str]
+) -> list[list[float]]:
+    """Embed texts in batches of EMBED_BATCH_SIZE, a few requests at a time.
+
+    Results are returned in the same order as texts.
+    """
+    semaphore = asyncio.Semaphore(EMBED_MAX_CONCURRENCY)
+
+    async def embed_batch(batch: list[str]) -> list[list[float]]:
+        async with semaphore:
+            # Spread out request starts so concurrent batches don't hit rate limits together
+            await asyncio.sleep(random.random() * EMBED_REQUEST_JITTER)
+            return await embeddings.aembed_documents(batch)
+
+    batches = await asyncio.gather(
+        *(
+            embed_batch(texts[start : start + EMBED_BATCH_SIZE])
+            for start in range(0, len(texts), EMBED_BATCH_SIZE)
+        )
+    )
+
+    return [vector for batch in batches for vector in batch]
+
+
+async def _store_documents(
+    vectorstore: Chroma, embeddings: OpenAIEmbeddings, documents: list[Document]
+) -> None:
+    """Embed documents and write them to the Chroma collection.
+
+    Chunks an earlier ingest stored for the same source_urls are deleted just
+    before the new ones are written, once embedding has succeeded. All chunks
+    of a page arrive in a single call (they come from one chunk_queue item).
+    """
+    texts = [doc.page_content for doc in documents]
+    metadatas = [doc.metadata for doc in documents]
+    ids = [str(uuid.uuid4()) for _ in documents]
+
+    # Repeated chunks (shared page boilerplate) are embedded once
+    unique_texts = list(dict.fromkeys(texts))
+    unique_vectors = await _embed_texts(embeddings, unique_texts)
+    vector_by_text = dict(zip(unique_texts, unique_vectors))
+    vectors = [vector_by_text[text] for text in texts]
+
+    # Replace whatever an earlier ingest stored for these pages
+    source_urls = list(dict.fromkeys(doc.metadata["source_url"] for doc in documents))
+    await asyncio.to_thread(
+        vectorstore.delete, where={"source_url": {"$in": source_urls}}
+    )
+
+    # Vectors are precomputed, so write straight to the collection in batches;
+    # the writes block, so they run off the event loop serving chat requests
+    for start in range(0, len(documents), CHROMA_ADD_BATCH_SIZE):
+        end = start + CHROMA_ADD_BATCH_SIZE
+        await asyncio.to_thread(
+            _chroma_collection(vectorstore).add,
+            ids=ids[start:end],
+            embeddings=vectors[start:end],  # type: ignore
+            documents=texts[start:end],
+            metadatas=metadatas[start:end],  # type: ignore
+        )
+
+
+async def create_vector_store(base_url: str, force: bool = False) -> Chroma:
     """Ingest a list of URLs, split into chunks and persist a Chroma DB.
 
+    base_url may hold several comma-separated URLs. Scraping, chunking and
+    embedding run as overlapping stages connected by bounded queues; embed
+    workers flush a batch once it reaches EMBED_BATCH_SIZE documents or no new
+    chunks arrived for INGEST_BATCH_TIMEOUT seconds.
+
+    Re-ingests are incremental: pages answering 304 to their stored
+    validators, or whose text hash is unchanged, keep their existing chunks;
+    changed pages have their old chunks replaced. force ignores the stored
+    validators and hashes, re-ingesting every page.
+
     Note: embeddings are created with the configured OPENAI API key.
     """
-    scrape_results = await scrape(base_url, strategy=CrawlStrategy.STATIC)
+    urls = [url.strip() for url in base_url.split(",") if url.strip()]
 
-    documents = []
-    for scrape_result in scrape_results:
-        chunks = _get_chunks(scrape_result.text)
+    embeddings = _get_embeddings()
+    vectorstore = Chroma(persist_directory=CHROMA_DB_PATH, embedding_function=embeddings)
 
-        documents.extend(
-            [
-                Document(
-                    page_content=chunk,
-                    metadata={
+    scrape_queue: asyncio.Queue[Optional[ScrapeResult]] = asyncio.Queue(
+        maxsize=INGEST_SCRAPE_QUEUE_SIZE
+    )
+    chunk_queue: asyncio.Queue[Optional[list[Document]]] = asyncio.Queue(
+        maxsize=INGEST_CHUNK_QUEUE_SIZE
+    )
+
+    ingest_state = _IngestState(INGEST_STATE_PATH)
+    updated_pages: dict[str, tuple[Optional[str], Optional[str], str]] = {}
+
+    async def scrape_url(url: str) -> None:
+        # Ask only for pages that changed since the last ingest
+        previous = None if force else ingest_state.get(url)
+        headers: dict[str, str] = {}
+        if previous:
+            etag, last_modified, _ = previous
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        for scrape_result in await scrape(
+            url, strategy=CrawlStrategy.STATIC, headers=headers or None
+        ):
+            content_hash = hashlib.sha256(scrape_result.text.encode()).hexdigest()
+            updated_pages[url] = (
+                scrape_result.etag,
+                scrape_result.last_modified,
+                content_hash,
+            )
+            if previous and previous[2] == content_hash:
+                continue
+
+            # Its old chunks are replaced when the new ones are stored, so a
+            # failed ingest leaves them in place
+            await scrape_queue.put(scrape_result)
+
+    async def chunk_results() -> None:
+        finished = False
+        while not finished:
+            # Split everything already scraped in one create_documents call
+            scrape_results: list[ScrapeResult] = []
+            item = await scrape_queue.get()
+            while item is not None:
+                scrape_results.append(item)
+                if scrape_queue.empty():
+                    break
+                item = scrape_queue.get_nowait()
+            finished = item is None
+
+            documents = await asyncio.to_thread(
+                _SPLITTER.create_documents,
+                [scrape_result.text for scrape_result in scrape_results],
+                metadatas=[
+                    {
                         "source_url": scrape_result.url,
                         "title": str(scrape_result.title),
                         "status_code": scrape_result.status_code,
-                    },
+                    }
+                    for scrape_result in scrape_results
+                ],
+            )
+            if documents:
+                await chunk_queue.put(documents)
+
+        # One stop signal per embed worker
+        for _ in range(INGEST_EMBED_WORKERS):
+            await chunk_queue.put(None)
+
+    async def embed_documents() -> None:
+        pending: list[Document] = []
+        finished = False
+
+        while not finished:
+            try:
+                batch = await asyncio.wait_for(
+                    chunk_queue.get(), timeout=INGEST_BATCH_TIMEOUT
                 )
-                for chunk in chunks
-            ]
-        )
+            except asyncio.TimeoutError:
+                batch = []
+
+            if batch is None:
+                finished = True
+            else:
+                pending.extend(batch)
+
+            timed_out = batch == []
+            if pending and (
+                finished or timed_out or len(pending) >= EMBED_BATCH_SIZE
+            ):
+                await _store_documents(vectorstore, embeddings, pending)
+                pending = []
+
+    async def scrape_urls() -> None:
+        async with asyncio.TaskGroup() as scrapers:
+            for url in urls:
+                scrapers.create_task(scrape_url(url))
+        await scrape_queue.put(None)
 
-    embeddings = _get_embeddings()
-
-    vectorstore = Chroma.from_documents(
-        documents=documents, embedding=embeddings, persist_directory=CHROMA_DB_PATH
-    )
+    try:
+        # All stages run in one group, so a failure in any of them cancels
+        # the rest instead of leaving producers blocked on a full queue
+        async with asyncio.TaskGroup() as stages:
+            stages.create_task(scrape_urls())
+            stages.create_task(chunk_results())
+            for _ in range(INGEST_EMBED_WORKERS):
+                stages.create_task(embed_documents())
+
+        # Only recorded once the new chunks are stored, so a failed ingest is
+        # retried in full next time
+        ingest_state.save(updated_pages)
+    finally:
+        ingest_state.close()
+
+    # Drop any handle, results and answers cached before ingestion finished
+    # (imported here: utils.ai imports this module)
+    from ..utils.ai import clear_response_caches
+
+    _get_vectorstore.cache_clear()
+    with _retrieval_cache_lock:
+        _retrieval_cache.clear()
+    clear_response_caches()
 
     return vectorstore
 
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from typing import Any, List, Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..config.db import engine
+from ..repositories.ai import save_chat, save_chats_bulk
+
+
+logger = logging.getLogger(__name__)
+
+PERSIST_QUEUE_MAXSIZE = 1000
+PERSIST_DRAIN_TIMEOUT = 10.0
+# Saves arriving close together are written with one INSERT and one commit
+PERSIST_BATCH_SIZE = 64
+PERSIST_BATCH_WAIT = 0.05  # seconds to wait for more saves after the first
+
+# (chat_id, user_id, messages)
+PersistItem = tuple[str, int, List[dict[str, Any]]]
+
+_persist_queue: Optional[asyncio.Queue[PersistItem]] = None
+
+
+async def _save(item: PersistItem) -> None:
+    chat_id, user_id, messages = item
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await save_chat(session, chat_id, user_id, messages)
+    except Exception as e:
+        # Log error but keep the worker alive
+        logger.error(f"Failed to save chat {chat_id}: {e}", exc_info=True)
+
+
+async def _save_batch(batch: List[PersistItem]) -> None:
+    if len(batch) == 1:
+        await _save(batch[0])
+        return
+
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            rejected = await save_chats_bulk(session, batch)
+        for chat_id in rejected:
+            logger.error(f"Failed to save chat {chat_id}: not found or access denied")
+    except Exception as e:
+        # Retry one by one so a single bad item doesn't drop the whole batch
+        logger.warning(f"Batched save of {len(batch)} chats failed, retrying: {e}")
+        for item in batch:
+            await _save(item)
+
+
+async def _persist_worker(queue: asyncio.Queue[PersistItem]) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + PERSIST_BATCH_WAIT
+        while len(batch) < PERSIST_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            await _save_batch(batch)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+def start_persist_worker() -> asyncio.Task:
+    """Create the persistence queue and spawn the task that drains it."""
+    global _persist_queue
+    _persist_queue = asyncio.Queue(maxsize=PERSIST_QUEUE_MAXSIZE)
+    return asyncio.create_task(_persist_worker(_persist_queue))
+
+
+async def stop_persist_worker(task: asyncio.Task) -> None:
+    """Flush pending saves (bounded by PERSIST_DRAIN_TIMEOUT) and stop the worker."""
+    global _persist_queue
+    if _persist_queue is not None:
+        try:
+            await asyncio.wait_for(_persist_queue.join(), PERSIST_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Dropping {_persist_queue.qsize()} pending chat saves on shutdown"
+            )
+        _persist_queue = None
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def enqueue_chat_save(
+    chat_id: str,
+    user_id: int,
+    messages: List[dict[str, Any]],
+) -> None:
+    """Hand messages over to the persistence worker without waiting for the DB.
+
+    Falls back to saving inline when no worker is running (e.g. lifespan
+    disabled), and drops the save with an error log when the queue is full.
+    """
+    item: PersistItem = (chat_id, user_id, messages)
+
+    if _persist_queue is None:
+        await _save(item)
+        return
+
+    try:
+        _persist_queue.put_nowait(item)
+    except asyncio.QueueFull:
+        logger.error(f"Persistence queue full, dropping save for chat {chat_id}")
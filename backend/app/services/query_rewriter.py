@@ -1,7 +1,13 @@
+import hashlib
+import json
 import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from enum import Enum
 
+from cachetools import LRUCache
 from openai import OpenAI
 
 from ..config.settings import get_settings
@@ -9,6 +15,65 @@ from ..config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Shared by all rewrites; COMBINED uses three workers per query
+REWRITE_MAX_WORKERS = 24
+
+_rewrite_executor = ThreadPoolExecutor(
+    max_workers=REWRITE_MAX_WORKERS, thread_name_prefix="query-rewrite"
+)
+
+# Rewrites keyed by (query hash, strategy): in memory first, then on disk so
+# they survive restarts and are shared between workers
+REWRITE_CACHE_SIZE = 1024
+REWRITE_CACHE_PATH = "./rewrite_cache.sqlite3"
+
+_rewrite_cache: LRUCache = LRUCache(maxsize=REWRITE_CACHE_SIZE)
+_rewrite_cache_lock = threading.Lock()
+
+
+class _RewriteDiskCache:
+    """Small SQLite key/value store for rewrite results."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rewrites (key TEXT PRIMARY KEY, queries TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[list[str]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT queries FROM rewrites WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, queries: list[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rewrites (key, queries) VALUES (?, ?)",
+                (key, json.dumps(queries)),
+            )
+            self._conn.commit()
+
+
+_disk_cache: Optional[_RewriteDiskCache] = None
+
+
+def _get_disk_cache() -> Optional[_RewriteDiskCache]:
+    """Open the disk cache on first use; rewriting works without it."""
+    global _disk_cache
+    with _rewrite_cache_lock:
+        if _disk_cache is None:
+            try:
+                _disk_cache = _RewriteDiskCache(REWRITE_CACHE_PATH)
+            except sqlite3.Error as e:
+                logger.warning(f"Query rewrite disk cache unavailable: {e}")
+                return None
+    return _disk_cache
+
 
 class RewriteStrategy(Enum):
     """Available query rewriting strategies."""
@@ -22,13 +87,20 @@ class RewriteStrategy(Enum):
 class QueryRewriter:
     """Service for rewriting and expanding queries to improve retrieval."""
 
-    def __init__(self, client: Optional[OpenAI] = None):
-        """Initialize the query rewriter with an OpenAI client."""
+    def __init__(
+        self, client: Optional[OpenAI] = None, use_batched_prompt: bool = True
+    ):
+        """Initialize the query rewriter with an OpenAI client.
+
+        With use_batched_prompt, the COMBINED strategy asks for all rewrites in
+        a single request instead of one request per strategy.
+        """
         if client is None:
             settings = get_settings()
             self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
         else:
             self.client = client
+        self.use_batched_prompt = use_batched_prompt
 
     def expand_query(self, query: str, num_variations: int = 3) -> list[str]:
         if not query or len(query.strip()) < 3:
@@ -165,6 +237,58 @@ Retorne APENAS a versão reformulada, sem explicação."""
             logger.error(f"Error reformulating query: {e}")
             return query
 
+    def combined_rewrite(self, query: str, num_variations: int = 2) -> list[str]:
+        """
+        Expand, simplify and reformulate the query with a single request.
+
+        Returns the rewritten queries (without the original), or an empty list
+        if the request or its JSON could not be used.
+        """
+        prompt = f"""Você é um especialista em reformular perguntas sobre Vestibular Unicamp.
+
+Para a pergunta abaixo, gere:
+- "expansions": {num_variations} variações com sinônimos, estrutura gramatical diferente ou contexto adicional relevante
+- "simplified": a pergunta apenas com os conceitos principais (mantenha nomes, datas, números e termos técnicos)
+- "reformulated": a pergunta reformulada com a terminologia técnica de vestibulares da Unicamp
+
+Pergunta original: "{query}"
+
+Retorne APENAS um objeto JSON com as chaves "expansions" (lista de strings), "simplified" e "reformulated"."""
+
+        try:
+            response = self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "Você reescreve perguntas para melhorar buscas. Retorne apenas JSON.",
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.5,
+                max_tokens=400,
+                response_format={"type": "json_object"},
+            )
+
+            data = json.loads(response.choices[0].message.content or "{}")
+
+            queries = [
+                str(variation).strip()
+                for variation in (data.get("expansions") or [])[:num_variations]
+            ]
+            for key in ("simplified", "reformulated"):
+                value = data.get(key)
+                if isinstance(value, str):
+                    queries.append(value.strip().strip('"'))
+
+            queries = [q for q in queries if q]
+            logger.debug(f"Combined rewrite: {len(queries)} queries generated")
+            return queries
+
+        except Exception as e:
+            logger.error(f"Error in combined rewrite: {e}")
+            return []
+
     def rewrite(
         self, query: str, strategy: RewriteStrategy = RewriteStrategy.COMBINED
     ) -> list[str]:
@@ -181,6 +305,36 @@ Retorne APENAS a versão reformulada, sem explicação."""
         if not query or len(query.strip()) < 3:
             return [query]
 
+        normalized_query = " ".join(query.lower().split())
+        cache_key = (
+            f"{hashlib.sha256(normalized_query.encode()).hexdigest()}:{strategy.value}"
+        )
+
+        with _rewrite_cache_lock:
+            cached = _rewrite_cache.get(cache_key)
+        if cached is None and (disk_cache := _get_disk_cache()) is not None:
+            cached = disk_cache.get(cache_key)
+            if cached is not None:
+                with _rewrite_cache_lock:
+                    _rewrite_cache[cache_key] = cached
+        if cached is not None:
+            return [query, *cached[1:]]
+
+        unique_queries = self._rewrite(query, strategy)
+
+        # Only keep real rewrites; a lone original usually means a failed call
+        if len(unique_queries) > 1:
+            with _rewrite_cache_lock:
+                _rewrite_cache[cache_key] = unique_queries
+            if (disk_cache := _get_disk_cache()) is not None:
+                try:
+                    disk_cache.set(cache_key, unique_queries)
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not persist query rewrite: {e}")
+
+        return unique_queries
+
+    def _rewrite(self, query: str, strategy: RewriteStrategy) -> list[str]:
         queries = [query]  # Always include original
 
         try:
@@ -197,15 +351,27 @@ Retorne APENAS a versão reformulada, sem explicação."""
                 if reformulated != query:
                     queries.append(reformulated)
 
+            elif strategy == RewriteStrategy.COMBINED and self.use_batched_prompt and (
+                combined := self.combined_rewrite(query)
+            ):
+                queries.extend(combined)
+
             elif strategy == RewriteStrategy.COMBINED:
-                # Apply all strategies
-                queries.extend(self.expand_query(query, num_variations=2))
+                # Apply all strategies; they are independent requests, so
+                # they run side by side instead of one after another
+                expanded = _rewrite_executor.submit(self.expand_query, query, 2)
+                simplified_future = _rewrite_executor.submit(self.simplify_query, query)
+                reformulated_future = _rewrite_executor.submit(
+                    self.reformulate_query, query
+                )
 
-                simplified = self.simplify_query(query)
+                queries.extend(expanded.result())
+
+                simplified = simplified_future.result()
                 if simplified != query:
                     queries.append(simplified)
 
-                reformulated = self.reformulate_query(query)
+                reformulated = reformulated_future.result()
                 if reformulated != query:
                     queries.append(reformulated)
 
@@ -1,18 +1,32 @@
-from urllib.parse import urlparse
+from urllib.parse import urldefrag, urljoin, urlparse
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+import hashlib
 import httpx
+import os
+import random
 import re
 from enum import Enum
 from dataclasses import dataclass
 import io
+import logging
 import tempfile
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 
-from bs4 import BeautifulSoup
-from typing import Optional, Set
+from bs4 import BeautifulSoup, SoupStrainer
+
+from selectolax.lexbor import LexborHTMLParser
+import pypdfium2 as pdfium
+from typing import AsyncGenerator, Optional, Set
 from pypdf import PdfReader
 
 from pydantic import BaseModel, Field
 
+logger = logging.getLogger(__name__)
+
 # --- Configuração como Constantes ---
 
 DEFAULT_USER_AGENT = (
@@ -22,6 +36,52 @@ DEFAULT_USER_AGENT = (
 
 BLOCK_TAGS_TO_REMOVE: Set[str] = {"script", "style", "noscript", "template"}
 STRUCTURAL_TAGS_TO_PRUNE: Set[str] = {"header", "footer", "nav", "aside"}
+TAGS_TO_DROP: Set[str] = BLOCK_TAGS_TO_REMOVE | STRUCTURAL_TAGS_TO_PRUNE
+
+# selectolax (Lexbor) handles text and link extraction, being much faster
+# than BeautifulSoup; set to False to force the BeautifulSoup path
+USE_SELECTOLAX = True
+
+# PDFium (pypdfium2) extracts PDF text much faster than pypdf's pure Python
+# parser; set to False to force pypdf
+USE_PDFIUM = True
+
+# lxml's C tree builder is several times faster than html.parser
+HTML_PARSER = "lxml"
+
+# Link extraction only needs anchors, so the rest of the page isn't built
+LINK_STRAINER = SoupStrainer("a", href=True)
+
+# Concurrent fetches per scrape() call and per crawl wave
+SCRAPE_MAX_CONCURRENCY = 16
+CRAWL_MAX_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 15.0  # seconds
+HTTP_LIMITS = httpx.Limits(
+    max_connections=200, max_keepalive_connections=100, keepalive_expiry=30.0
+)
+HTTP_CONNECT_RETRIES = 2
+# HTTP/2 multiplexes same-host crawl requests over one connection
+HTTP2_ENABLED = True
+SCRAPE_MAX_BYTES = 5 * 1024 * 1024  # HTML pages larger than this are skipped
+PDF_MAX_BYTES = 50 * 1024 * 1024  # PDFs larger than this are skipped
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Politeness: requests to the same host are spaced to at most this rate, and
+# 429/503 answers are retried with exponential backoff (or Retry-After)
+HOST_RATE_LIMIT = 10.0  # requests per second per host
+RETRY_STATUS_CODES = {429, 503}
+RETRY_MAX_ATTEMPTS = 3
+RETRY_MAX_BACKOFF = 30.0  # seconds
+
+# PDF parsing is CPU-bound pure Python, so it runs in worker processes
+PDF_MAX_WORKERS = os.cpu_count()
+# HTML pages at least this large are parsed in a worker thread so a big
+# document doesn't stall the other in-flight fetches
+HTML_THREAD_MIN_BYTES = 256 * 1024
+
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+_scrape_client: Optional[httpx.AsyncClient] = None
+_host_limiters: dict[str, "_HostRateLimiter"] = {}
 
 
 class CrawlStrategy(str, Enum):
@@ -39,120 +99,432 @@ class ScrapeResult:
     text: str
     title: Optional[str]
     status_code: int
+    # Cache validators, sent back as conditional headers on the next ingest
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
 
 
-async def extract_pdf_text(pdf_bytes: bytes, url: str) -> Optional[str]:
-    """Extract text from PDF bytes."""
+@dataclass(slots=True)
+class CrawlPage:
+    """A URL found by the crawler, with the response it was fetched with.
 
-    try:
-        pdf_file = io.BytesIO(pdf_bytes)
-        reader = PdfReader(pdf_file)
+    body holds the HTML or PDF bytes the crawler read; it is None for other
+    content types and oversized documents, which scrape() skips. response is
+    None for pages that could not be fetched; scrape() fetches those itself.
+    content_type is empty when the crawler never got a response.
+    """
+
+    url: str
+    response: Optional[httpx.Response] = None
+    body: Optional[bytes] = None
+    content_type: str = ""
 
-        if len(reader.pages) == 0:
-            print(f"PDF from {url} has no pages")
-            return None
 
+def _read_pdf_pdfium(pdf_bytes: bytes, url: str) -> tuple[list[str], Optional[str]]:
+    """Return (page texts, metadata title) of a PDF using PDFium."""
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
         text_parts = []
-        for page_num, page in enumerate(reader.pages):
+        for page_num in range(len(pdf)):
+            page = pdf[page_num]
             try:
-                page_text = page.extract_text()
+                textpage = page.get_textpage()
+                page_text = textpage.get_text_range()
+                textpage.close()
                 if page_text:
                     text_parts.append(page_text)
             except Exception as e:
-                print(f"Error extracting text from page {page_num} in {url}: {e}")
-                continue
+                logger.warning(f"Error extracting text from page {page_num} in {url}: {e}")
+            finally:
+                page.close()
+
+        title = pdf.get_metadata_dict().get("Title") or None
+        return text_parts, title
+    finally:
+        pdf.close()
+
+
+def _read_pdf_pypdf(pdf_bytes: bytes, url: str) -> tuple[list[str], Optional[str]]:
+    """Return (page texts, metadata title) of a PDF using pypdf."""
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+
+    text_parts = []
+    for page_num, page in enumerate(reader.pages):
+        try:
+            page_text = page.extract_text()
+            if page_text:
+                text_parts.append(page_text)
+        except Exception as e:
+            logger.warning(f"Error extracting text from page {page_num} in {url}: {e}")
+            continue
+
+    title = None
+    try:
+        metadata = reader.metadata
+        if metadata and metadata.title:
+            title = str(metadata.title)
+    except Exception:
+        pass
+
+    return text_parts, title
+
+
+def _extract_pdf_text_sync(
+    pdf_bytes: bytes, url: str
+) -> tuple[Optional[str], Optional[str]]:
+    """Extract (text, metadata title) from PDF bytes with a single parse.
+
+    CPU-bound, runs in the PDF process pool.
+    """
+
+    try:
+        if USE_PDFIUM:
+            text_parts, title = _read_pdf_pdfium(pdf_bytes, url)
+        else:
+            text_parts, title = _read_pdf_pypdf(pdf_bytes, url)
 
         if not text_parts:
-            print(f"No text could be extracted from PDF: {url}")
-            return None
+            logger.warning(f"No text could be extracted from PDF: {url}")
+            return None, None
 
-        # Join all pages and clean up whitespace
-        full_text = "\n".join(text_parts)
-        full_text = re.sub(r"\s+", " ", full_text).strip()
+        # Join all pages and collapse whitespace in one pass, without first
+        # building the newline-joined copy of the whole document
+        full_text = " ".join(word for part in text_parts for word in part.split())
 
-        return full_text
+        return full_text, title
 
     except Exception as e:
-        print(f"Error processing PDF from {url}: {e}")
+        logger.warning(f"Error processing PDF from {url}: {e}")
+        return None, None
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """Return the process pool used for PDF parsing, creating it on first use."""
+    global _pdf_executor
+    if _pdf_executor is None:
+        _pdf_executor = ProcessPoolExecutor(max_workers=PDF_MAX_WORKERS)
+    return _pdf_executor
+
+
+def shutdown_pdf_executor() -> None:
+    global _pdf_executor
+    if _pdf_executor is not None:
+        _pdf_executor.shutdown(cancel_futures=True)
+        _pdf_executor = None
+
+
+async def extract_pdf_text(
+    pdf_bytes: bytes, url: str
+) -> tuple[Optional[str], Optional[str]]:
+    """Extract (text, title) from PDF bytes without blocking the event loop."""
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_pdf_executor(), _extract_pdf_text_sync, pdf_bytes, url
+    )
+
+
+def get_scrape_client() -> httpx.AsyncClient:
+    """Return the scraper's shared client, creating it on first use.
+
+    Reused across scrape() and crawl() calls so connections to the same hosts
+    are kept alive between ingests.
+    """
+    global _scrape_client
+    if _scrape_client is None:
+        _scrape_client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=DEFAULT_TIMEOUT,
+            headers={"User-Agent": DEFAULT_USER_AGENT},
+            # Limits live on the transport when one is passed explicitly
+            transport=httpx.AsyncHTTPTransport(
+                http2=HTTP2_ENABLED,
+                limits=HTTP_LIMITS,
+                retries=HTTP_CONNECT_RETRIES,
+            ),
+        )
+    return _scrape_client
+
+
+async def close_scrape_client() -> None:
+    global _scrape_client
+    if _scrape_client is not None:
+        await _scrape_client.aclose()
+        _scrape_client = None
+
+
+class _HostRateLimiter:
+    """Spaces out request starts to a single host at a fixed rate."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next_slot = 0.0
+
+    async def wait(self) -> None:
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        # Reserve the slot before sleeping so concurrent callers queue up
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _get_host_limiter(url: str) -> _HostRateLimiter:
+    host = urlparse(url).netloc
+    limiter = _host_limiters.get(host)
+    if limiter is None:
+        limiter = _host_limiters[host] = _HostRateLimiter(HOST_RATE_LIMIT)
+    return limiter
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying, honouring Retry-After when present."""
+    retry_after = response.headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_BACKOFF)
+        except ValueError:
+            pass
+        try:
+            when = parsedate_to_datetime(retry_after)
+            delay = (when - datetime.now(timezone.utc)).total_seconds()
+            return min(max(delay, 0.0), RETRY_MAX_BACKOFF)
+        except (TypeError, ValueError):
+            pass
+    return min(2**attempt, RETRY_MAX_BACKOFF) + random.random()
+
+
+@asynccontextmanager
+async def _polite_stream(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    timeout: float,
+    headers: Optional[dict[str, str]] = None,
+) -> AsyncGenerator[httpx.Response, None]:
+    """client.stream("GET", url) rate limited per host, retrying 429/503."""
+    limiter = _get_host_limiter(url)
+
+    for attempt in range(RETRY_MAX_ATTEMPTS + 1):
+        await limiter.wait()
+        async with client.stream(
+            "GET", url, timeout=timeout, headers=headers
+        ) as response:
+            if (
+                response.status_code not in RETRY_STATUS_CODES
+                or attempt == RETRY_MAX_ATTEMPTS
+            ):
+                yield response
+                return
+            delay = _retry_delay(response, attempt)
+
+        logger.info(
+            f"{url} answered {response.status_code}, retrying in {delay:.1f}s"
+        )
+        await asyncio.sleep(delay)
+
+
+async def _read_limited(response: httpx.Response, max_bytes: int) -> Optional[bytes]:
+    """Read a streamed body, giving up (None) as soon as it exceeds max_bytes."""
+    content_length = int(response.headers.get("content-length") or 0)
+    if content_length > max_bytes:
+        return None
+
+    buf = bytearray()
+    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+        buf.extend(chunk)
+        if len(buf) > max_bytes:
+            return None
+    return bytes(buf)
+
+
+async def _read_body(
+    response: httpx.Response, url: str, content_type: str
+) -> Optional[bytes]:
+    """Read an HTML or PDF body within its size limit.
+
+    Returns None (after logging why) for other content types and for bodies
+    over the limit, which are then left out of the scrape.
+    """
+    if "text/html" in content_type:
+        max_bytes = SCRAPE_MAX_BYTES
+    elif "application/pdf" in content_type:
+        max_bytes = PDF_MAX_BYTES
+    else:
+        logger.info(
+            f"Content type '{content_type}' of '{url}' is not supported. "
+            f"Supported types: text/html, application/pdf"
+        )
         return None
 
+    # Stops reading once the running size passes the limit, whether or not
+    # Content-Length was declared
+    body = await _read_limited(response, max_bytes)
+    if body is None:
+        logger.info(f"Skipping '{url}': larger than {max_bytes} bytes")
+    return body
+
+
+async def _scrape_body(
+    url: str, response: httpx.Response, body: bytes, content_type: str
+) -> Optional[ScrapeResult]:
+    """Route a body read by _read_body to the PDF or HTML scraper."""
+    if "application/pdf" in content_type:
+        return await scrape_pdf_bytes(url, response, body)
+    return await scrape_html(url, response, body)
+
 
 async def scrape_pdf(
     url: str,
     client: httpx.AsyncClient,
-    timeout: float = 15.0,
+    timeout: float = DEFAULT_TIMEOUT,
+    headers: Optional[dict[str, str]] = None,
 ) -> Optional[ScrapeResult]:
     """Download and scrape a PDF document."""
 
     try:
-        response = await client.get(url, timeout=timeout)
-        response.raise_for_status()
+        async with _polite_stream(
+            client, url, timeout=timeout, headers=headers
+        ) as response:
+            # Checked first: raise_for_status() treats 304 as an error
+            if response.status_code == 304:
+                logger.info(f"PDF {url} not modified since last scrape")
+                return None
 
-        # Extract text from PDF
-        text = await extract_pdf_text(response.content, url)
+            response.raise_for_status()
 
-        if not text:
+            pdf_bytes = await _read_body(response, url, "application/pdf")
+
+        if pdf_bytes is None:
             return None
+        return await scrape_pdf_bytes(url, response, pdf_bytes)
 
-        # Try to get title from URL or PDF metadata
-        title = None
-        try:
-            reader = PdfReader(io.BytesIO(response.content))
-            metadata = reader.metadata
-            if metadata and metadata.title:
-                title = metadata.title
-        except Exception:
-            pass
+    except httpx.HTTPStatusError as exc:
+        logger.warning(
+            f"HTTP Error downloading PDF {exc.response.url}: {exc.response.status_code}"
+        )
+        return None
+    except Exception as e:
+        logger.warning(f"Error scraping PDF from {url}: {e}")
+        return None
+
+
+async def scrape_pdf_bytes(
+    url: str,
+    response: httpx.Response,
+    pdf_bytes: bytes,
+) -> Optional[ScrapeResult]:
+    """Scrape a PDF document from pdf_bytes, the body read from response."""
+
+    try:
+        # Extract text and metadata title from PDF
+        text, title = await extract_pdf_text(pdf_bytes, url)
+
+        if not text:
+            return None
 
         # Fallback to URL-based title
         if not title:
-            title = Path(urlparse(url).path).stem or "PDF Document"
+            filename = urlparse(url).path.rsplit("/", 1)[-1]
+            title = filename.rsplit(".", 1)[0] or "PDF Document"
 
         return ScrapeResult(
             url=str(response.url),
             text=text,
             title=title,
             status_code=response.status_code,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
         )
-
-    except httpx.HTTPStatusError as exc:
-        print(
-            f"HTTP Error downloading PDF {exc.response.url}: {exc.response.status_code}"
-        )
-        return None
     except Exception as e:
-        print(f"Error scraping PDF from {url}: {e}")
+        logger.warning(f"Error scraping PDF from {url}: {e}")
         return None
 
 
+HtmlMarkup = str | bytes
+
+
+def _lexbor_tree(html: HtmlMarkup, encoding: Optional[str] = None):
+    """Parse html with selectolax, handing it raw UTF-8 bytes undecoded."""
+    encoding = encoding or "utf-8"
+    if isinstance(html, bytes) and encoding.lower() not in ("utf-8", "utf8"):
+        # Lexbor reads bytes as UTF-8, anything else is decoded first
+        html = html.decode(encoding, errors="replace")
+    return LexborHTMLParser(html)
+
+
+def _soup(html: HtmlMarkup, encoding: Optional[str] = None, **kwargs) -> BeautifulSoup:
+    """Parse html with BeautifulSoup, letting it decode raw bytes itself."""
+    if isinstance(html, bytes):
+        kwargs["from_encoding"] = encoding
+    return BeautifulSoup(html, HTML_PARSER, **kwargs)
+
+
+def _extract_html_lexbor(
+    html: HtmlMarkup, encoding: Optional[str] = None
+) -> tuple[str, Optional[str]]:
+    """Return (text, title) of an HTML page using selectolax."""
+    tree = _lexbor_tree(html, encoding)
+
+    # remove tags (and their content) in one pass
+    tree.strip_tags(list(TAGS_TO_DROP))
+
+    text = tree.root.text(separator=" ", strip=True) if tree.root else ""
+    text = " ".join(text.split())
+
+    title_node = tree.css_first("title")
+    title = title_node.text(strip=True) if title_node else None
+
+    return text, title or None
+
+
+def _extract_html_bs4(
+    html: HtmlMarkup, encoding: Optional[str] = None
+) -> tuple[str, Optional[str]]:
+    """Return (text, title) of an HTML page using BeautifulSoup."""
+    soup = _soup(html, encoding)
+
+    # remove tags in a single tree walk
+    for element in soup.find_all(TAGS_TO_DROP):
+        element.decompose()
+
+    text = soup.get_text(separator=" ", strip=True)
+    text = " ".join(text.split())
+
+    title = soup.title.string.strip() if soup.title and soup.title.string else None
+
+    return text, title
+
+
 async def scrape_html(
     url: str,
     response: httpx.Response,
+    html: bytes,
 ) -> Optional[ScrapeResult]:
-    """Scrape HTML content from response."""
+    """Scrape HTML content from html, the body read from response."""
 
     try:
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # remove tags
-        for element in soup.find_all(BLOCK_TAGS_TO_REMOVE):
-            element.decompose()
-        for element in soup.find_all(STRUCTURAL_TAGS_TO_PRUNE):
-            element.decompose()
-
-        text = soup.get_text(separator=" ", strip=True)
-        text = re.sub(r"\s+", " ", text).strip()
+        if USE_SELECTOLAX:
+            extract = _extract_html_lexbor
+        else:
+            extract = _extract_html_bs4
 
-        title = soup.title.string.strip() if soup.title and soup.title.string else None
+        # The parsers get the raw body, so it isn't decoded into a str first
+        if len(html) >= HTML_THREAD_MIN_BYTES:
+            text, title = await asyncio.to_thread(extract, html, response.encoding)
+        else:
+            text, title = extract(html, response.encoding)
 
         return ScrapeResult(
             url=str(response.url),
             text=text,
             title=title,
             status_code=response.status_code,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
         )
     except Exception as e:
-        print(f"Error scraping HTML from {url}: {e}")
+        logger.warning(f"Error scraping HTML from {url}: {e}")
         return None
 
 
@@ -167,6 +539,7 @@ class URLCrawler:
         follow_external: bool = False,
         include_patterns: Optional[list[str]] = None,
         exclude_patterns: Optional[list[str]] = None,
+        concurrency: int = CRAWL_MAX_CONCURRENCY,
     ):
         self.base_url = base_url
         self.domain = urlparse(base_url).netloc
@@ -175,13 +548,20 @@ class URLCrawler:
         self.follow_external = follow_external
         self.include_patterns = [re.compile(p) for p in (include_patterns or [])]
         self.exclude_patterns = [re.compile(p) for p in (exclude_patterns or [])]
+        self.concurrency = concurrency
         self.visited: Set[str] = set()
-        self.to_visit: list[tuple[str, int]] = [(base_url, 0)]  # (url, depth)
+        self.to_visit: deque[tuple[str, int]] = deque([(base_url, 0)])  # (url, depth)
+        # URLs currently queued in to_visit, so a link is never queued twice
+        self.pending: Set[str] = {base_url}
 
-    def _normalize_url(self, url: str) -> Optional[str]:
-        """Normalize and validate urls"""
+    def _normalize_url(self, url: str, base: str) -> Optional[str]:
+        """Normalize and validate urls, resolving relative links against base"""
+        url, _ = urldefrag(urljoin(base, url))
         parsed = urlparse(url)
 
+        if parsed.scheme not in ("http", "https"):
+            return None
+
         if not self.follow_external and parsed.netloc != self.domain:
             return None
 
@@ -192,153 +572,217 @@ class URLCrawler:
             p.search(url) for p in self.include_patterns
         ):
             return None
-        return url.split("#")[0]
+        return url
 
-    def _extract_links(self, html: str) -> list[str]:
+    def _extract_links(
+        self, html: HtmlMarkup, page_url: str, encoding: Optional[str] = None
+    ) -> list[str]:
         """Extrai links de um HTML"""
-        soup = BeautifulSoup(html, "html.parser")
-        links = []
+        if USE_SELECTOLAX:
+            hrefs = [
+                anchor.attributes.get("href")
+                for anchor in _lexbor_tree(html, encoding).css("a[href]")
+            ]
+        else:
+            soup = _soup(html, encoding, parse_only=LINK_STRAINER)
+            hrefs = [anchor["href"] for anchor in soup.find_all("a", href=True)]
 
-        for anchor in soup.find_all("a", href=True):
-            href = anchor["href"]
-            normalized = self._normalize_url(href) if isinstance(href, str) else None
+        links = []
+        for href in hrefs:
+            normalized = (
+                self._normalize_url(href, page_url) if isinstance(href, str) else None
+            )
 
             if normalized and normalized not in self.visited:
                 links.append(normalized)
 
         return links
 
+    async def _fetch_page(
+        self, client: httpx.AsyncClient, url: str, timeout: float
+    ) -> tuple[list[str], Optional[httpx.Response], Optional[bytes], str]:
+        """Fetch url and return its links, response, body and content type"""
+        try:
+            async with _polite_stream(client, url, timeout=timeout) as response:
+                response.raise_for_status()
+
+                content_type = response.headers.get("content-type", "")
+
+                # HTML and PDF bodies are read once here and kept for
+                # scrape(); other content types and oversized bodies aren't
+                body = await _read_body(response, url, content_type)
+
+            # Only HTML documents are crawled into; PDFs are collected
+            if body is None or "text/html" not in content_type:
+                return [], response, body, content_type
+
+            return (
+                self._extract_links(body, str(response.url), response.encoding),
+                response,
+                body,
+                content_type,
+            )
+
+        except Exception as e:
+            logger.warning(f"Error processing {url}: {e}")
+            return [], None, None, ""
+
     async def crawl(
         self,
         client: Optional[httpx.AsyncClient] = None,
-        timeout: float = 15.0,
-    ) -> list[str]:
-        """Crawl recursively and extracts urls (both HTML and PDF)"""
-        created_client = False
-        if client is None:
-            client = httpx.AsyncClient(
-                follow_redirects=True,
-                timeout=timeout,
-                headers={"User-Agent": DEFAULT_USER_AGENT},
-            )
-            created_client = True
-
-        try:
-            discovered_urls = []
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> list[CrawlPage]:
+        """Crawl recursively and extracts urls (both HTML and PDF)
 
-            while self.to_visit and len(discovered_urls) < self.max_urls:
-                url, depth = self.to_visit.pop(0)
+        HTML and PDF bodies are kept on the returned pages so scrape() doesn't
+        download them a second time.
+        """
+        if client is None:
+            client = get_scrape_client()
+
+        discovered_urls = []
+        pages: list[CrawlPage] = []
+
+        while self.to_visit and len(discovered_urls) < self.max_urls:
+            # Take the next wave of unvisited URLs off the BFS queue
+            wave: list[tuple[str, int]] = []
+            while (
+                self.to_visit
+                and len(wave) < self.concurrency
+                and len(discovered_urls) + len(wave) < self.max_urls
+            ):
+                url, depth = self.to_visit.popleft()
+                self.pending.discard(url)
 
                 if url in self.visited or depth > self.max_depth:
                     continue
 
                 self.visited.add(url)
-                discovered_urls.append(url)
-
-                try:
-                    response = await client.get(url)
-                    response.raise_for_status()
-
-                    content_type = response.headers.get("content-type", "")
-
-                    # Only extract links from HTML documents
-                    if "text/html" in content_type:
-                        # find links
-                        new_links = self._extract_links(response.text)
-
-                        for link in new_links:
-                            if len(discovered_urls) < self.max_urls:
-                                self.to_visit.append((link, depth + 1))
-                    elif "application/pdf" in content_type:
-                        # PDFs are collected but we don't crawl into them
-                        pass
-                    else:
-                        # Skip unsupported content types
-                        continue
+                wave.append((url, depth))
 
-                except Exception as e:
-                    print(f"Error processing {url}: {e}")
-                    continue
+            discovered_urls.extend(url for url, _ in wave)
 
-            with open("urls.txt", "w") as f:
-                f.write("\n".join(discovered_urls))
-                f.close()
+            # Fetch the whole wave concurrently, then queue links in order
+            wave_pages = await asyncio.gather(
+                *(self._fetch_page(client, url, timeout) for url, _ in wave)
+            )
+            for (url, depth), (new_links, response, body, content_type) in zip(
+                wave, wave_pages
+            ):
+                pages.append(CrawlPage(url, response, body, content_type))
+                for link in new_links:
+                    if len(discovered_urls) >= self.max_urls:
+                        break
+                    if link in self.visited or link in self.pending:
+                        continue
+                    self.pending.add(link)
+                    self.to_visit.append((link, depth + 1))
 
-            return discovered_urls
+        logger.debug(f"Crawled {len(discovered_urls)} URLs from {self.base_url}")
 
-        finally:
-            if created_client:
-                await client.aclose()
+        return pages
 
 
 async def scrape(
     base_url: str,
     *,
     client: Optional[httpx.AsyncClient] = None,
-    timeout: float = 15.0,
+    timeout: float = DEFAULT_TIMEOUT,
     strategy: CrawlStrategy = CrawlStrategy.RECURSIVE,
+    headers: Optional[dict[str, str]] = None,
+    concurrency: int = SCRAPE_MAX_CONCURRENCY,
 ) -> list[ScrapeResult]:
-    created_client = False
+    """Scrape base_url (and, for RECURSIVE, the pages crawled from it).
 
+    headers are added to the requests scrape() makes for base_url itself, e.g.
+    conditional If-None-Match/If-Modified-Since (validators of one resource
+    don't apply to the pages crawled from it); a 304 leaves it out. At most
+    concurrency pages are fetched at a time (also the crawler's wave size).
+    """
     if client is None:
-        client = httpx.AsyncClient(
-            follow_redirects=True,
-            timeout=timeout,
-            headers={"User-Agent": DEFAULT_USER_AGENT},
-        )
-        created_client = True
+        client = get_scrape_client()
+
+    # Se a estratégia for estática, use apenas o link fornecido.
+    if strategy == CrawlStrategy.STATIC:
+        pages = [CrawlPage(url=base_url)]
     else:
-        client = client
+        crawler = URLCrawler(base_url, concurrency=concurrency)
+        pages = await crawler.crawl(client)
 
-    try:
-        # Se a estratégia for estática, use apenas o link fornecido.
-        if strategy == CrawlStrategy.STATIC:
-            urls = [base_url]
-        else:
-            crawler = URLCrawler(base_url)
-            urls = await crawler.crawl(client)
+    semaphore = asyncio.Semaphore(concurrency)
 
+    def normalize(url: str) -> str:
         # Normaliza cada URL para garantir esquema (http/https) quando ausente
-        normalized_urls = [
-            url if re.match(r"^https?://", url) else f"https://{url}" for url in urls
-        ]
-
-        results: list[ScrapeResult] = []
+        return url if url.startswith(("http://", "https://")) else f"https://{url}"
+
+    base_normalized_url = normalize(base_url)
+
+    async def scrape_one(page: CrawlPage) -> Optional[ScrapeResult]:
+        normalized_url = normalize(page.url)
+        url_headers = headers if normalized_url == base_normalized_url else None
+
+        async with semaphore:
+            # Pages the crawler got a response for are parsed from the body it
+            # read, or skipped (unsupported type, too large) without refetching
+            if page.response is not None:
+                if page.body is None:
+                    return None
+                return await _scrape_body(
+                    normalized_url, page.response, page.body, page.content_type
+                )
+            return await fetch_and_parse(normalized_url, url_headers)
 
-        for normalized_url in normalized_urls:
-            try:
-                response = await client.get(normalized_url)
+    async def fetch_and_parse(
+        normalized_url: str, headers: Optional[dict[str, str]]
+    ) -> Optional[ScrapeResult]:
+        try:
+            # Look at the headers before downloading the body, so unsupported
+            # types and oversized documents are never read
+            async with _polite_stream(
+                client, normalized_url, timeout=timeout, headers=headers
+            ) as response:
+                if response.status_code == 304:
+                    logger.info(f"{normalized_url} not modified since last scrape")
+                    return None
 
                 # Get content type
                 content_type = response.headers.get("content-type", "")
+                body = await _read_body(response, str(response.url), content_type)
 
-                # Route to appropriate handler based on content type
-                if "application/pdf" in content_type:
-                    result = await scrape_pdf(normalized_url, client, timeout)
-                    if result:
-                        results.append(result)
-                elif "text/html" in content_type:
-                    result = await scrape_html(normalized_url, response)
-                    if result:
-                        results.append(result)
-                else:
-                    print(
-                        f"Content type '{content_type}' of '{response.url}' is not supported. "
-                        f"Supported types: text/html, application/pdf"
-                    )
-                    continue
-
-            except httpx.HTTPStatusError as exc:
-                print(
-                    f"HTTP Error searching {exc.response.url}: {exc.response.status_code}"
-                )
-                continue
-            except (httpx.HTTPError, ValueError, Exception) as exc:
-                print(f"Error processing {normalized_url}: {exc}")
-                continue
+            if body is None:
+                return None
+            # Route to appropriate handler based on content type
+            return await _scrape_body(normalized_url, response, body, content_type)
 
-        return results
+        except httpx.HTTPStatusError as exc:
+            logger.warning(
+                f"HTTP Error searching {exc.response.url}: {exc.response.status_code}"
+            )
+            return None
+        except (httpx.HTTPError, ValueError, Exception) as exc:
+            logger.warning(f"Error processing {normalized_url}: {exc}")
+            return None
 
-    finally:
-        if created_client:
-            await client.aclose()
+    # Fetch and parse all URLs concurrently, keeping input order
+    # One page failing unexpectedly must not cancel the others
+    scraped = await asyncio.gather(
+        *(scrape_one(page) for page in pages), return_exceptions=True
+    )
+
+    # Mirrored/aliased URLs often serve the same page; keep the first copy
+    # so duplicates aren't chunked and embedded again
+    results: list[ScrapeResult] = []
+    seen_hashes: Set[bytes] = set()
+    for result in scraped:
+        if isinstance(result, BaseException):
+            logger.warning(f"Unexpected error scraping from {base_url}: {result}")
+            continue
+        if not result:
+            continue
+        text_hash = hashlib.sha256(result.text.encode()).digest()
+        if text_hash in seen_hashes:
+            continue
+        seen_hashes.add(text_hash)
+        results.append(result)
+
+    return results
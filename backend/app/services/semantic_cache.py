@@ -0,0 +1,86 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# Answers to single-question chats, looked up by the cosine similarity of the
+# question embedding; set high so only true paraphrases are served. Entries
+# are scoped to the user who asked, so a paraphrase never replays an answer
+# to someone else's wording
+SEMANTIC_CACHE_SIZE = 512
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+CachedEvents = List[Dict[str, Any]]
+
+
+class SemanticResponseCache:
+    """Fixed-size store of (question embedding, response events).
+
+    Embeddings are kept L2-normalized in one matrix, so a lookup is a single
+    matrix-vector product. When full, the oldest entry is overwritten; entries
+    older than ttl seconds, or added under another scope, are never served.
+    """
+
+    def __init__(self, size: int, threshold: float, ttl: float):
+        self.size = size
+        self.threshold = threshold
+        self.ttl = ttl
+        self._vectors: Optional[np.ndarray] = None
+        self._added = np.zeros(size, np.float64)  # time.monotonic() per slot
+        self._scopes = np.zeros(size, np.int64)
+        self._events: List[Optional[CachedEvents]] = [None] * size
+        self._count = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> Optional[np.ndarray]:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        if not norm:
+            return None
+        return array / norm
+
+    def get(self, vector: Sequence[float], scope: int) -> Optional[CachedEvents]:
+        query = self._normalize(vector)
+        if query is None:
+            return None
+
+        with self._lock:
+            if not self._count or self._vectors is None:
+                return None
+            if self._vectors.shape[1] != query.shape[0]:
+                return None  # embedding model changed
+            scores = self._vectors[: self._count] @ query
+            expired = self._added[: self._count] <= time.monotonic() - self.ttl
+            scores[expired] = -np.inf
+            scores[self._scopes[: self._count] != scope] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            return self._events[best]
+
+    def add(self, vector: Sequence[float], scope: int, events: CachedEvents) -> None:
+        array = self._normalize(vector)
+        if array is None:
+            return
+
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != array.shape[0]:
+                self._vectors = np.zeros((self.size, array.shape[0]), np.float32)
+                self._events = [None] * self.size
+                self._count = self._next = 0
+
+            self._vectors[self._next] = array
+            self._added[self._next] = time.monotonic()
+            self._scopes[self._next] = scope
+            self._events[self._next] = events
+            self._next = (self._next + 1) % self.size
+            self._count = min(self._count + 1, self.size)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events = [None] * self.size
+            self._count = self._next = 0
@@ -1,19 +1,148 @@
-import json
+import hashlib
+import io
 import logging
-import traceback
+import threading
 import uuid
-from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence
 
+import orjson
+from cachetools import TTLCache
 from fastapi import BackgroundTasks
 from fastapi.responses import StreamingResponse
 from openai import OpenAI
 from openai.types.chat.chat_completion_message_param import ChatCompletionMessageParam
-from sqlmodel import Session
 
-from ..config import settings
-from ..config.db import engine
-from ..repositories.ai import save_chat
-from ..schemas.ai import ClientMessage
+from ..config.settings import get_settings
+from ..schemas.ai import ClientMessage, ClientMessagePart
+from ..services.embedding import embed_query
+from ..services.persistence import enqueue_chat_save
+from ..services.semantic_cache import (
+    SEMANTIC_CACHE_SIZE,
+    SEMANTIC_CACHE_THRESHOLD,
+    SemanticResponseCache,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+# Converted chat history keyed by chat_id: (persisted message count, messages)
+CONVERT_CACHE_SIZE = 1024
+CONVERT_CACHE_TTL = 600  # seconds
+
+_convert_cache: TTLCache = TTLCache(maxsize=CONVERT_CACHE_SIZE, ttl=CONVERT_CACHE_TTL)
+
+# Completed responses keyed by a hash of (model, messages); the events after
+# "start" are replayed on an identical request
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL = 3600  # seconds
+
+_response_cache: TTLCache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+_response_cache_lock = threading.Lock()
+
+# Answers to lone questions, matched by question embedding per user; same
+# lifetime
+_semantic_cache = SemanticResponseCache(
+    SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, RESPONSE_CACHE_TTL
+)
+# Retrieval has usually embedded the question already; when it hasn't, the
+# lookup waits this long for OpenAI before going straight to the model
+SEMANTIC_CACHE_EMBED_TIMEOUT = 1.0  # seconds
+SEMANTIC_CACHE_EMBED_WORKERS = 4
+
+_embed_executor = ThreadPoolExecutor(
+    max_workers=SEMANTIC_CACHE_EMBED_WORKERS, thread_name_prefix="semantic-cache"
+)
+
+# orjson rejects non-str dict keys by default; json.dumps used to coerce them
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+CONTEXT_INSTRUCTIONS = (
+    "# Você é um assistente especializado em responder perguntas sobre o Vestibular da Unicamp 2026.\n\n"
+    "## INSTRUÇÕES CRÍTICAS:\n"
+    "1. Use **APENAS** as informações fornecidas no contexto abaixo\n"
+    "2. Estruture suas respostas de forma clara e organizada\n"
+    "3. **SEMPRE** forneça informações específicas (datas, valores, números) quando disponíveis\n"
+    "4. Combine informações de múltiplas seções do contexto quando necessário para dar resposta completa\n"
+    "5. Responda com pelo menos 2-3 frases para garantir completude\n"
+    "6. Se houver múltiplos pontos relevantes, use listas ou parágrafos bem definidos\n"
+    "7. Cite a fonte quando disponível para aumentar credibilidade\n\n"
+    "## REGRA DE OURO:\n"
+    "Se a resposta estiver incompleta no contexto, indique claramente o que está faltando.\n"
+    "Se realmente não souber a resposta, diga apenas: \"Não tenho informações sobre esse tema com os dados disponíveis.\"\n\n"
+    "## CONTEXTO FORNECIDO:\n"
+)
+
+
+def json_dumps(obj: Any) -> str:
+    """Serialize obj to a compact JSON string (for fields OpenAI wants as str)."""
+    return orjson.dumps(obj, option=JSON_OPTIONS).decode()
+
+
+def format_sse(payload: Mapping[str, Any]) -> bytes:
+    """Encode payload as a single Server-Sent Events data frame."""
+    return b"data: " + orjson.dumps(payload, option=JSON_OPTIONS) + b"\n\n"
+
+
+# Events that are the same on every response; they are shared (don't mutate
+# them) and their frames are encoded once
+TEXT_STREAM_ID = "text-1"
+TEXT_START_EVENT: Dict[str, Any] = {"type": "text-start", "id": TEXT_STREAM_ID}
+TEXT_END_EVENT: Dict[str, Any] = {"type": "text-end", "id": TEXT_STREAM_ID}
+FINISH_EVENT: Dict[str, Any] = {"type": "finish"}
+
+SSE_DONE = b"data: [DONE]\n\n"
+
+_CONSTANT_FRAMES: Dict[int, bytes] = {
+    id(event): format_sse(event)
+    for event in (TEXT_START_EVENT, TEXT_END_EVENT, FINISH_EVENT)
+}
+
+# text-delta is emitted once per token; only its delta needs serializing
+_TEXT_DELTA_FRAME_HEAD = format_sse(
+    {"type": "text-delta", "id": TEXT_STREAM_ID, "delta": None}
+)[: -len(b"null}\n\n")]
+_TEXT_DELTA_FRAME_TAIL = b"}\n\n"
+
+
+def text_delta_event(delta: str) -> Dict[str, Any]:
+    return {"type": "text-delta", "id": TEXT_STREAM_ID, "delta": delta}
+
+
+def encode_event(event: Mapping[str, Any]) -> bytes:
+    """format_sse, with fast paths for the constant and text-delta events."""
+    if (
+        event.get("type") == "text-delta"
+        and event.get("id") == TEXT_STREAM_ID
+        and len(event) == 3
+    ):
+        return (
+            _TEXT_DELTA_FRAME_HEAD
+            + orjson.dumps(event["delta"])
+            + _TEXT_DELTA_FRAME_TAIL
+        )
+    frame = _CONSTANT_FRAMES.get(id(event))
+    if frame is None:
+        frame = format_sse(event)
+    return frame
+
+
+def _strip_within_budget(text: str, budget: int) -> str:
+    """text.strip(), without copying a long text that will be cut anyway.
+
+    When text clearly exceeds budget only a prefix is stripped; the result is
+    still longer than budget, so the caller truncates it exactly as it would
+    have truncated the fully stripped text.
+    """
+    if len(text) > 2 * budget:
+        head = text[: 2 * budget].lstrip()
+        if len(head.rstrip()) > budget:
+            return head
+    return text.strip()
 
 
 def build_context_message_from_documents(
@@ -21,43 +150,46 @@ def build_context_message_from_documents(
 ) -> ChatCompletionMessageParam:
     """Convert retrieved Documents into a single system message to be prepended
     to the messages sent to the LLM.
+
+    docs are expected best-first (as returned by retrieve_docs); assembly stops
+    as soon as the max_chars budget is spent.
     """
-    parts: list[str] = []
+    buf = io.StringIO()
     total = 0
+    has_parts = False
 
     for doc in docs:
-        if total >= max_chars:
+        remaining = max_chars - total
+        if remaining <= 0:
             break
-        text = getattr(doc, "page_content", str(doc)) or ""
+        # str(doc) only as a fallback: as a getattr default it would render
+        # every Document in full
+        text = getattr(doc, "page_content", None)
+        if text is None:
+            text = str(doc)
         meta = getattr(doc, "metadata", {}) or {}
         source = meta.get("source_url") or meta.get("source") or meta.get("url")
-        snippet = text.strip()
+        snippet = _strip_within_budget(text, remaining)
+        length = len(snippet)
+
+        if has_parts:
+            buf.write(CONTEXT_SEPARATOR)
+        if source:
+            buf.write(f"[source:{source}] ")
+
+        # Limit per-doc so we don't blow past max_chars; the ellipsis is
+        # written separately instead of concatenated onto the slice
+        if length > remaining:
+            buf.write(snippet[: max(remaining - 3, 0)])
+            buf.write("...")
+            length = remaining
+        else:
+            buf.write(snippet)
+        total += length
+        has_parts = True
 
-        # Limit per-doc so we don't blow past max_chars
-        remaining = max_chars - total
-        if len(snippet) > remaining:
-            snippet = snippet[: remaining - 3] + "..."
-
-        citation = f"[source:{source}] " if source else ""
-        parts.append(f"{citation}{snippet}")
-        total += len(snippet)
-
-    if parts:
-        content = (
-            "# Você é um assistente especializado em responder perguntas sobre o Vestibular da Unicamp 2026.\n\n"
-            "## INSTRUÇÕES CRÍTICAS:\n"
-            "1. Use **APENAS** as informações fornecidas no contexto abaixo\n"
-            "2. Estruture suas respostas de forma clara e organizada\n"
-            "3. **SEMPRE** forneça informações específicas (datas, valores, números) quando disponíveis\n"
-            "4. Combine informações de múltiplas seções do contexto quando necessário para dar resposta completa\n"
-            "5. Responda com pelo menos 2-3 frases para garantir completude\n"
-            "6. Se houver múltiplos pontos relevantes, use listas ou parágrafos bem definidos\n"
-            "7. Cite a fonte quando disponível para aumentar credibilidade\n\n"
-            "## REGRA DE OURO:\n"
-            "Se a resposta estiver incompleta no contexto, indique claramente o que está faltando.\n"
-            "Se realmente não souber a resposta, diga apenas: \"Não tenho informações sobre esse tema com os dados disponíveis.\"\n\n"
-            "## CONTEXTO FORNECIDO:\n"
-        ) + "\n\n---\n\n".join(parts)
+    if has_parts:
+        content = CONTEXT_INSTRUCTIONS + buf.getvalue()
     else:
         content = ""  # no context available
 
@@ -90,6 +222,85 @@ def build_title_from_query(
     title = response.choices[0].message.content.strip()
     return title
 
+# Per-part converters for convert_to_openai_messages; each appends to the
+# message's content parts, tool calls and tool result messages
+def _convert_text_part(
+    part: ClientMessagePart,
+    message_parts: List[dict],
+    tool_calls: List[dict],
+    tool_result_messages: List[dict],
+) -> None:
+    # Ensure empty strings default to ''
+    message_parts.append({"type": "text", "text": part.text or ""})
+
+
+def _convert_file_part(
+    part: ClientMessagePart,
+    message_parts: List[dict],
+    tool_calls: List[dict],
+    tool_result_messages: List[dict],
+) -> None:
+    url = part.url
+    if not url:
+        return
+    content_type = part.contentType
+    if content_type and content_type.startswith("image"):
+        message_parts.append({"type": "image_url", "image_url": {"url": url}})
+    else:
+        # Fall back to including the URL as text if we cannot map the file directly.
+        message_parts.append({"type": "text", "text": url})
+
+
+def _convert_tool_part(
+    part: ClientMessagePart,
+    message_parts: List[dict],
+    tool_calls: List[dict],
+    tool_result_messages: List[dict],
+) -> None:
+    tool_call_id = part.toolCallId
+    tool_name = part.toolName or part.type[len("tool-") :]
+    if not (tool_call_id and tool_name):
+        return
+
+    state = part.state
+    arguments = part.input if part.input is not None else part.args
+
+    if arguments is not None or (
+        state and ("call" in state or "input" in state)
+    ):
+        if isinstance(arguments, str):
+            serialized_arguments = arguments
+        else:
+            serialized_arguments = json_dumps(arguments or {})
+
+        tool_calls.append(
+            {
+                "id": tool_call_id,
+                "type": "function",
+                "function": {
+                    "name": tool_name,
+                    "arguments": serialized_arguments,
+                },
+            }
+        )
+
+    output = part.output
+    if state == "output-available" and output is not None:
+        tool_result_messages.append(
+            {
+                "role": "tool",
+                "tool_call_id": tool_call_id,
+                "content": json_dumps(output),
+            }
+        )
+
+
+_PART_HANDLERS: Dict[str, Callable[..., None]] = {
+    "text": _convert_text_part,
+    "file": _convert_file_part,
+}
+
+
 def convert_to_openai_messages(
     messages: List[ClientMessage],
 ) -> List[ChatCompletionMessageParam]:
@@ -102,66 +313,13 @@ def convert_to_openai_messages(
 
         if message.parts:
             for part in message.parts:
-                if part.type == "text":
-                    # Ensure empty strings default to ''
-                    message_parts.append({"type": "text", "text": part.text or ""})
-
-                elif part.type == "file":
-                    if (
-                        part.contentType
-                        and part.contentType.startswith("image")
-                        and part.url
-                    ):
-                        message_parts.append(
-                            {"type": "image_url", "image_url": {"url": part.url}}
-                        )
-                    elif part.url:
-                        # Fall back to including the URL as text if we cannot map the file directly.
-                        message_parts.append({"type": "text", "text": part.url})
-
+                handler = _PART_HANDLERS.get(part.type)
+                if handler is not None:
+                    handler(part, message_parts, tool_calls, tool_result_messages)
                 elif part.type.startswith("tool-"):
-                    tool_call_id = part.toolCallId
-                    tool_name = part.toolName or part.type.replace("tool-", "", 1)
-
-                    if tool_call_id and tool_name:
-                        should_emit_tool_call = False
-
-                        if part.state and any(
-                            keyword in part.state for keyword in ("call", "input")
-                        ):
-                            should_emit_tool_call = True
-
-                        if part.input is not None or part.args is not None:
-                            should_emit_tool_call = True
-
-                        if should_emit_tool_call:
-                            arguments = (
-                                part.input if part.input is not None else part.args
-                            )
-                            if isinstance(arguments, str):
-                                serialized_arguments = arguments
-                            else:
-                                serialized_arguments = json.dumps(arguments or {})
-
-                            tool_calls.append(
-                                {
-                                    "id": tool_call_id,
-                                    "type": "function",
-                                    "function": {
-                                        "name": tool_name,
-                                        "arguments": serialized_arguments,
-                                    },
-                                }
-                            )
-
-                        if part.state == "output-available" and part.output is not None:
-                            tool_result_messages.append(
-                                {
-                                    "role": "tool",
-                                    "tool_call_id": tool_call_id,
-                                    "content": json.dumps(part.output),
-                                }
-                            )
+                    _convert_tool_part(
+                        part, message_parts, tool_calls, tool_result_messages
+                    )
 
         elif message.content is not None:
             message_parts.append({"type": "text", "text": message.content})
@@ -184,7 +342,7 @@ def convert_to_openai_messages(
                         "type": "function",
                         "function": {
                             "name": toolInvocation.toolName,
-                            "arguments": json.dumps(toolInvocation.args),
+                            "arguments": json_dumps(toolInvocation.args),
                         },
                     }
                 )
@@ -213,7 +371,7 @@ def convert_to_openai_messages(
                 tool_message = {
                     "role": "tool",
                     "tool_call_id": toolInvocation.toolCallId,
-                    "content": json.dumps(toolInvocation.result),
+                    "content": json_dumps(toolInvocation.result),
                 }
 
                 openai_messages.append(tool_message)  # type: ignore
@@ -223,29 +381,96 @@ def convert_to_openai_messages(
     return openai_messages
 
 
-def stream_text(
+def ui_to_client_message(msg: Mapping[str, Any]) -> ClientMessage:
+    """Convert a stored UIMessage dict back to a ClientMessage (text parts only)."""
+    role = msg.get("role", "user")
+    parts_data = msg.get("parts", [])
+    content = ""
+
+    parts = []
+    for part_data in parts_data:
+        if part_data.get("type") == "text":
+            text = part_data.get("text", "")
+            content += text
+            parts.append(ClientMessagePart(type="text", text=text))
+
+    return ClientMessage(role=role, content=content, parts=parts if parts else None)
+
+
+def convert_history_to_openai_messages(
+    chat_id: str, history: Sequence[Mapping[str, Any]]
+) -> tuple[List[ClientMessage], List[ChatCompletionMessageParam]]:
+    """Convert persisted chat history, reusing the conversion from earlier turns.
+
+    Stored messages are append-only, so only the tail persisted since the last
+    call is converted. Returns the newly converted ClientMessages (the whole
+    history on a cache miss) and the full list of OpenAI messages.
+    """
+    cached = _convert_cache.get(chat_id)
+    start, converted = cached if cached else (0, [])
+    if start > len(history):
+        # History shrank (e.g. deleted elsewhere); rebuild from scratch
+        start, converted = 0, []
+
+    tail = [ui_to_client_message(msg) for msg in history[start:]]
+    converted = converted + convert_to_openai_messages(tail)
+    _convert_cache[chat_id] = (len(history), converted)
+
+    return tail, list(converted)
+
+
+def invalidate_converted_messages(chat_id: str) -> None:
+    _convert_cache.pop(chat_id, None)
+
+
+@dataclass(slots=True)
+class ToolCallState:
+    """A tool call being assembled from streamed deltas."""
+
+    id: Optional[str] = None
+    name: Optional[str] = None
+    arguments: List[str] = field(default_factory=list)  # joined once at the end
+    started: bool = False
+
+    def maybe_start(self) -> Optional[Dict[str, Any]]:
+        """Return the tool-input-start event the first time id and name are known."""
+        if self.started or self.id is None or self.name is None:
+            return None
+        self.started = True
+        return {"type": "tool-input-start", "toolCallId": self.id, "toolName": self.name}
+
+
+@dataclass(slots=True)
+class StreamContext:
+    """Message id and reply text of a stream, filled in while it is consumed."""
+
+    message_id: Optional[str] = None
+    text: io.StringIO = field(default_factory=io.StringIO)
+
+
+def _stream_events(
     client: OpenAI,
     messages: Sequence[ChatCompletionMessageParam],
     tool_definitions: Sequence[Dict[str, Any]],
     available_tools: Mapping[str, Callable[..., Any]],
     model: str,
-    protocol: str = "data",
-):
-    """Yield Server-Sent Events for a streaming chat completion."""
-    try:
-
-        def format_sse(payload: dict) -> str:
-            return f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+    ctx: Optional[StreamContext] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield the UI message stream events of a chat completion as dicts.
 
+    Errors are reported as a final "error" event instead of being raised.
+    """
+    try:
         message_id = f"msg-{uuid.uuid4().hex}"
-        text_stream_id = "text-1"
+        if ctx is not None:
+            ctx.message_id = message_id
         text_started = False
         text_finished = False
         finish_reason = None
         usage_data = None
-        tool_calls_state: Dict[int, Dict[str, Any]] = {}
+        tool_calls_state: Dict[int, ToolCallState] = {}
 
-        yield format_sse({"type": "start", "messageId": message_id})
+        yield {"type": "start", "messageId": message_id}
 
         stream = client.chat.completions.create(
             messages=messages,
@@ -263,174 +488,111 @@ def stream_text(
                 if delta is None:
                     continue
 
-                if delta.content is not None:
+                content = delta.content
+                if content is not None:
                     if not text_started:
-                        yield format_sse({"type": "text-start", "id": text_stream_id})
+                        yield TEXT_START_EVENT
                         text_started = True
-                    yield format_sse(
-                        {
-                            "type": "text-delta",
-                            "id": text_stream_id,
-                            "delta": delta.content,
-                        }
-                    )
+                    if ctx is not None:
+                        ctx.text.write(content)
+                    yield text_delta_event(content)
 
                 if delta.tool_calls:
                     for tool_call_delta in delta.tool_calls:
-                        index = tool_call_delta.index
-                        state = tool_calls_state.setdefault(
-                            index,
-                            {
-                                "id": None,
-                                "name": None,
-                                "arguments": "",
-                                "started": False,
-                            },
-                        )
+                        state = tool_calls_state.get(tool_call_delta.index)
+                        if state is None:
+                            state = tool_calls_state[tool_call_delta.index] = (
+                                ToolCallState()
+                            )
 
                         if tool_call_delta.id is not None:
-                            state["id"] = tool_call_delta.id
-                            if (
-                                state["id"] is not None
-                                and state["name"] is not None
-                                and not state["started"]
-                            ):
-                                yield format_sse(
-                                    {
-                                        "type": "tool-input-start",
-                                        "toolCallId": state["id"],
-                                        "toolName": state["name"],
-                                    }
-                                )
-                                state["started"] = True
+                            state.id = tool_call_delta.id
 
                         function_call = getattr(tool_call_delta, "function", None)
-                        if function_call is not None:
-                            if function_call.name is not None:
-                                state["name"] = function_call.name
-                                if (
-                                    state["id"] is not None
-                                    and state["name"] is not None
-                                    and not state["started"]
-                                ):
-                                    yield format_sse(
-                                        {
-                                            "type": "tool-input-start",
-                                            "toolCallId": state["id"],
-                                            "toolName": state["name"],
-                                        }
-                                    )
-                                    state["started"] = True
-
-                            if function_call.arguments:
-                                if (
-                                    state["id"] is not None
-                                    and state["name"] is not None
-                                    and not state["started"]
-                                ):
-                                    yield format_sse(
-                                        {
-                                            "type": "tool-input-start",
-                                            "toolCallId": state["id"],
-                                            "toolName": state["name"],
-                                        }
-                                    )
-                                    state["started"] = True
-
-                                state["arguments"] += function_call.arguments
-                                if state["id"] is not None:
-                                    yield format_sse(
-                                        {
-                                            "type": "tool-input-delta",
-                                            "toolCallId": state["id"],
-                                            "inputTextDelta": function_call.arguments,
-                                        }
-                                    )
+                        if function_call is not None and function_call.name is not None:
+                            state.name = function_call.name
+
+                        start_event = state.maybe_start()
+                        if start_event is not None:
+                            yield start_event
+
+                        if function_call is not None and function_call.arguments:
+                            state.arguments.append(function_call.arguments)
+                            if state.id is not None:
+                                yield {
+                                    "type": "tool-input-delta",
+                                    "toolCallId": state.id,
+                                    "inputTextDelta": function_call.arguments,
+                                }
 
             if not chunk.choices and chunk.usage is not None:
                 usage_data = chunk.usage
 
         if finish_reason == "stop" and text_started and not text_finished:
-            yield format_sse({"type": "text-end", "id": text_stream_id})
+            yield TEXT_END_EVENT
             text_finished = True
 
         if finish_reason == "tool_calls":
             for index in sorted(tool_calls_state.keys()):
                 state = tool_calls_state[index]
-                tool_call_id = state.get("id")
-                tool_name = state.get("name")
+                tool_call_id = state.id
+                tool_name = state.name
 
                 if tool_call_id is None or tool_name is None:
                     continue
 
-                if not state["started"]:
-                    yield format_sse(
-                        {
-                            "type": "tool-input-start",
-                            "toolCallId": tool_call_id,
-                            "toolName": tool_name,
-                        }
-                    )
-                    state["started"] = True
+                start_event = state.maybe_start()
+                if start_event is not None:
+                    yield start_event
 
-                raw_arguments = state["arguments"]
+                raw_arguments = "".join(state.arguments)
                 try:
                     parsed_arguments = (
-                        json.loads(raw_arguments) if raw_arguments else {}
+                        orjson.loads(raw_arguments) if raw_arguments else {}
                     )
                 except Exception as error:
-                    yield format_sse(
-                        {
-                            "type": "tool-input-error",
-                            "toolCallId": tool_call_id,
-                            "toolName": tool_name,
-                            "input": raw_arguments,
-                            "errorText": str(error),
-                        }
-                    )
-                    continue
-
-                yield format_sse(
-                    {
-                        "type": "tool-input-available",
+                    yield {
+                        "type": "tool-input-error",
                         "toolCallId": tool_call_id,
                         "toolName": tool_name,
-                        "input": parsed_arguments,
+                        "input": raw_arguments,
+                        "errorText": str(error),
                     }
-                )
+                    continue
+
+                yield {
+                    "type": "tool-input-available",
+                    "toolCallId": tool_call_id,
+                    "toolName": tool_name,
+                    "input": parsed_arguments,
+                }
 
                 tool_function = available_tools.get(tool_name)
                 if tool_function is None:
-                    yield format_sse(
-                        {
-                            "type": "tool-output-error",
-                            "toolCallId": tool_call_id,
-                            "errorText": f"Tool '{tool_name}' not found.",
-                        }
-                    )
+                    yield {
+                        "type": "tool-output-error",
+                        "toolCallId": tool_call_id,
+                        "errorText": f"Tool '{tool_name}' not found.",
+                    }
                     continue
 
                 try:
                     tool_result = tool_function(**parsed_arguments)
                 except Exception as error:
-                    yield format_sse(
-                        {
-                            "type": "tool-output-error",
-                            "toolCallId": tool_call_id,
-                            "errorText": str(error),
-                        }
-                    )
+                    yield {
+                        "type": "tool-output-error",
+                        "toolCallId": tool_call_id,
+                        "errorText": str(error),
+                    }
                 else:
-                    yield format_sse(
-                        {
-                            "type": "tool-output-available",
-                            "toolCallId": tool_call_id,
-                            "output": tool_result,
-                        }
-                    )
+                    yield {
+                        "type": "tool-output-available",
+                        "toolCallId": tool_call_id,
+                        "output": tool_result,
+                    }
 
         if text_started and not text_finished:
-            yield format_sse({"type": "text-end", "id": text_stream_id})
+            yield TEXT_END_EVENT
             text_finished = True
 
         finish_metadata: Dict[str, Any] = {}
@@ -448,23 +610,140 @@ def stream_text(
             finish_metadata["usage"] = usage_payload
 
         if finish_metadata:
-            yield format_sse({"type": "finish", "messageMetadata": finish_metadata})
+            yield {"type": "finish", "messageMetadata": finish_metadata}
         else:
-            yield format_sse({"type": "finish"})
-
-        yield "data: [DONE]\n\n"
+            yield FINISH_EVENT
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error streaming the chat completion")
         # Send error message in SSE format instead of raising
         error_message = str(e)
 
-        yield format_sse(
-            {
-                "type": "error",
-                "errorText": error_message,
-            }
+        yield {
+            "type": "error",
+            "errorText": error_message,
+        }
+
+
+def _response_cache_key(
+    model: str, messages: Sequence[ChatCompletionMessageParam]
+) -> Optional[str]:
+    try:
+        payload = orjson.dumps(
+            [model, messages], option=JSON_OPTIONS | orjson.OPT_SORT_KEYS
         )
-        yield "data: [DONE]\n\n"
+    except TypeError:
+        return None  # not plain JSON, don't cache
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def clear_response_caches() -> None:
+    """Forget every cached answer, e.g. once the documents behind them change."""
+    with _response_cache_lock:
+        _response_cache.clear()
+    _semantic_cache.clear()
+
+
+def _embed_for_cache(query: str) -> Optional[List[float]]:
+    """embed_query, giving up after SEMANTIC_CACHE_EMBED_TIMEOUT seconds."""
+    future = _embed_executor.submit(embed_query, query)
+    try:
+        return future.result(timeout=SEMANTIC_CACHE_EMBED_TIMEOUT)
+    except TimeoutError:
+        # A request already sent still fills embed_query's cache when it lands
+        future.cancel()
+        logger.info("Question embedding is slow, skipping the semantic cache")
+    except Exception as e:
+        logger.warning(f"Could not embed question for the semantic cache: {e}")
+    return None
+
+
+def _cached_stream_events(
+    client: OpenAI,
+    messages: Sequence[ChatCompletionMessageParam],
+    tool_definitions: Sequence[Dict[str, Any]],
+    available_tools: Mapping[str, Callable[..., Any]],
+    model: str,
+    cache_query: Optional[str] = None,
+    user_id: Optional[int] = None,
+    ctx: Optional[StreamContext] = None,
+) -> Iterator[Dict[str, Any]]:
+    """_stream_events, replaying a previous completion of the same prompt.
+
+    When cache_query (the question of a chat with no history) and user_id are
+    given, an earlier answer to that user's question with a near-identical
+    embedding is replayed too. Only text answers that finished normally are
+    stored; tool calls and errors always go to the model.
+    """
+    cache_enabled = get_settings().RESPONSE_CACHE_ENABLED
+    cache_key = _response_cache_key(model, messages) if cache_enabled else None
+
+    cached = None
+    if cache_key is not None:
+        with _response_cache_lock:
+            cached = _response_cache.get(cache_key)
+
+    query_vector = None
+    if cached is None and cache_enabled and cache_query and user_id is not None:
+        query_vector = _embed_for_cache(cache_query)
+        if query_vector is not None:
+            cached = _semantic_cache.get(query_vector, user_id)
+
+    if cached is not None:
+        message_id = f"msg-{uuid.uuid4().hex}"
+        if ctx is not None:
+            ctx.message_id = message_id
+            for event in cached:
+                if event.get("type") == "text-delta":
+                    ctx.text.write(event["delta"])
+        yield {"type": "start", "messageId": message_id}
+        yield from cached
+        return
+
+    events: List[Dict[str, Any]] = []
+    cacheable = cache_key is not None
+    for event in _stream_events(
+        client, messages, tool_definitions, available_tools, model, ctx
+    ):
+        event_type = event.get("type", "")
+        if event_type == "error" or event_type.startswith("tool-"):
+            cacheable = False
+        elif event_type == "finish":
+            finish_reason = event.get("messageMetadata", {}).get("finishReason")
+            cacheable = cacheable and finish_reason == "stop"
+        if event_type != "start":
+            events.append(event)
+        yield event
+
+    if cacheable and events and events[-1].get("type") == "finish":
+        with _response_cache_lock:
+            _response_cache[cache_key] = events
+        if query_vector is not None and user_id is not None:
+            _semantic_cache.add(query_vector, user_id, events)
+
+
+def stream_text(
+    client: OpenAI,
+    messages: Sequence[ChatCompletionMessageParam],
+    tool_definitions: Sequence[Dict[str, Any]],
+    available_tools: Mapping[str, Callable[..., Any]],
+    model: str,
+    protocol: str = "data",
+    cache_query: Optional[str] = None,
+    user_id: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Yield Server-Sent Events for a streaming chat completion."""
+    for event in _cached_stream_events(
+        client,
+        messages,
+        tool_definitions,
+        available_tools,
+        model,
+        cache_query,
+        user_id,
+    ):
+        yield encode_event(event)
+
+    yield SSE_DONE
 
 
 def stream_text_with_persistence(
@@ -478,60 +757,42 @@ def stream_text_with_persistence(
     chat_id: str,
     user_id: int,
     background_tasks: BackgroundTasks,
-) -> Any:
+    cache_query: Optional[str] = None,
+) -> Iterator[bytes]:
     """
     Stream text response with persistence support.
     Tracks message completion and saves to database when stream completes.
+    ui_messages holds only the messages added in this turn; the assistant
+    reply is appended to them before saving.
     """
-    collected_delta: List[str] = []
-    message_id: Optional[str] = None
-
-    for event in stream_text(
+    # The stream fills in the message id and reply text as it goes, so the
+    # events don't need to be inspected here
+    ctx = StreamContext()
+    for event in _cached_stream_events(
         client,
         messages,
         tool_definitions,
         available_tools,
         model,
-        protocol,
+        cache_query,
+        user_id,
+        ctx,
     ):
-        # Parse SSE event to track message completion
-        if isinstance(event, str) and event.startswith("data: "):
-            try:
-                data_str = event[6:].strip()
-                if data_str == "[DONE]":
-                    # Save messages when stream completes
-                    assistant_msg = {
-                        "id": message_id or f"msg-{uuid.uuid4().hex[:16]}",
-                        "role": "assistant",
-                        "parts": [{"type": "text", "text": "".join(collected_delta)}],
-                    }
-                    final_messages = ui_messages + [assistant_msg]
-
-                    # Create a wrapper that creates a new session for the background task
-                    def save_chat_task():
-                        try:
-                            with Session(engine) as bg_session:
-                                save_chat(bg_session, chat_id, user_id, final_messages)
-                        except Exception as e:
-                            # Log error but don't fail the request
-                            logger = logging.getLogger(__name__)
-                            logger.error(
-                                f"Failed to save chat {chat_id}: {e}",
-                                exc_info=True,
-                            )
+        yield encode_event(event)
 
-                    background_tasks.add_task(save_chat_task)
-                else:
-                    data = json.loads(data_str)
-                    if data.get("type") == "start":
-                        message_id = data.get("messageId")
-                    elif data.get("type") == "text-delta":
-                        delta = data.get("delta", "")
-                        collected_delta.append(delta)
-            except Exception:
-                pass
+    # Save messages when stream completes
+    assistant_msg = {
+        "id": ctx.message_id or f"msg-{uuid.uuid4().hex[:16]}",
+        "role": "assistant",
+        "parts": [{"type": "text", "text": ctx.text.getvalue()}],
+    }
+    final_messages = ui_messages + [assistant_msg]
 
-        yield event
+    # Runs on the event loop once the response is sent; the actual DB write
+    # happens in the persistence worker
+    background_tasks.add_task(enqueue_chat_save, chat_id, user_id, final_messages)
+
+    yield SSE_DONE
 
 
 def patch_response_with_headers(
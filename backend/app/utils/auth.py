@@ -1,33 +1,44 @@
-from datetime import datetime, timedelta, timezone
+import time
+from functools import lru_cache
 
 from fastapi import HTTPException, Response
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
 
 from ..config.settings import SettingsDep
 
 
+@lru_cache(maxsize=4)
+def _jwt_key(secret: str, alg: str) -> Key:
+    """Build the signing key once; given a raw secret, jose rebuilds it per call
+    (and, when verifying, first tries to parse it as a JSON JWK)."""
+    return jwk.construct(secret, alg)
+
+
 def create_jwt(
     settings: SettingsDep,
     sub: str,
     alg: str,
     exp_minutes: int,
 ):
-    now = datetime.now(timezone.utc)
-    exp = now + timedelta(minutes=exp_minutes)
+    # Integer NumericDates; no datetime conversion needed while encoding
+    now = int(time.time())
 
     payload = {
         "sub": sub,
         "iat": now,
-        "exp": exp.timestamp(),
+        "exp": now + exp_minutes * 60,
     }
-    token = jwt.encode(payload, settings.JWT_SECRET, algorithm=alg)
+    token = jwt.encode(payload, _jwt_key(settings.JWT_SECRET, alg), algorithm=alg)
 
     return token
 
 
 def verify_jwt(settings: SettingsDep, token: str, alg: str):
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[alg])
+        payload = jwt.decode(
+            token, _jwt_key(settings.JWT_SECRET, alg), algorithms=[alg]
+        )
         return payload
     except JWTError:
         raise HTTPException(status_code=401)
@@ -12,3 +12,10 @@ def test_health_endpoint():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+def test_ready_endpoint_without_ingestion():
+    """Test that readiness reports idle ingestion when nothing was scheduled."""
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "ingestion": "idle"}
@@ -0,0 +1,15 @@
+"""Tests for model helpers."""
+
+import time
+
+from app.models.ai import uuid7
+
+
+def test_uuid7_version_and_ordering():
+    """Test that uuid7 ids are version 7 and sort by creation time."""
+    first = uuid7()
+    time.sleep(0.002)
+    second = uuid7()
+
+    assert first.version == 7
+    assert str(first) < str(second)
@@ -0,0 +1,20 @@
+"""Tests for report endpoint."""
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_report_revalidation():
+    """Test that the report is cacheable and revalidates with its ETag."""
+    response = client.get("/report")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["cache-control"] == "public, max-age=3600"
+
+    etag = response.headers["etag"]
+    response = client.get("/report", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
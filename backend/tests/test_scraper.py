@@ -0,0 +1,270 @@
+"""Tests for the URL crawler helpers."""
+
+import asyncio
+
+import httpx
+
+from app.services import scraper
+from app.services.scraper import CrawlStrategy, URLCrawler, scrape, scrape_pdf
+
+
+def test_extract_links_resolves_relative_hrefs():
+    """Test that relative links are resolved against the page and fragments dropped."""
+    crawler = URLCrawler("https://www.comvest.unicamp.br/")
+    html = (
+        '<a href="/vestibular-2026/#datas">datas</a>'
+        '<a href="edital.pdf">edital</a>'
+        '<a href="https://example.com/fora">externo</a>'
+        '<a href="mailto:contato@comvest.unicamp.br">email</a>'
+    )
+
+    links = crawler._extract_links(html, "https://www.comvest.unicamp.br/inscricoes/")
+
+    assert links == [
+        "https://www.comvest.unicamp.br/vestibular-2026/",
+        "https://www.comvest.unicamp.br/inscricoes/edital.pdf",
+    ]
+
+
+def test_fetch_retries_rate_limited_responses():
+    """Test that a 429 answer is retried after Retry-After and then succeeds."""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"retry-after": "0"})
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/html"},
+            html='<a href="/edital">edital</a>',
+        )
+
+    async def fetch():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as client:
+            crawler = URLCrawler("https://www.comvest.unicamp.br/")
+            return await crawler._fetch_page(
+                client, "https://www.comvest.unicamp.br/", timeout=5
+            )
+
+    links, response, _, _ = asyncio.run(fetch())
+
+    assert len(calls) == 2
+    assert response is not None and response.status_code == 200
+    assert links == ["https://www.comvest.unicamp.br/edital"]
+
+
+def test_crawl_fetches_each_url_once():
+    """Test that a link found on several pages is queued and fetched only once."""
+    calls = []
+    pages = {
+        "/": '<a href="/a">a</a><a href="/b">b</a>',
+        "/a": '<a href="/c">c</a><a href="/b">b</a>',
+        "/b": '<a href="/c">c</a><a href="/a">a</a>',
+        "/c": "",
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/html"},
+            html=pages[request.url.path],
+        )
+
+    async def crawl():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as client:
+            return await URLCrawler("https://www.comvest.unicamp.br/").crawl(client)
+
+    crawled = asyncio.run(crawl())
+
+    assert sorted(calls) == ["/", "/a", "/b", "/c"]
+    assert len(crawled) == 4
+
+
+def test_scrape_sends_conditional_headers_only_for_base_url():
+    """Test that the seed URL's validators aren't sent to the PDFs crawled from it."""
+    pdf_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/edital.pdf":
+            pdf_requests.append(request.headers.get("if-none-match"))
+            return httpx.Response(404, headers={"content-type": "application/pdf"})
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/html"},
+            html='<title>Comvest</title><a href="/edital.pdf">edital</a>',
+        )
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as client:
+            return await scrape(
+                "https://www.comvest.unicamp.br/",
+                client=client,
+                strategy=CrawlStrategy.RECURSIVE,
+                headers={"If-None-Match": '"seed"'},
+            )
+
+    asyncio.run(run())
+
+    assert pdf_requests and all(etag is None for etag in pdf_requests)
+
+
+def test_scrape_pdf_treats_304_as_not_modified(caplog):
+    """Test that an unchanged PDF is skipped instead of raising on the 304."""
+    transport = httpx.MockTransport(lambda request: httpx.Response(304))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await scrape_pdf(
+                "https://www.comvest.unicamp.br/edital.pdf",
+                client,
+                headers={"If-None-Match": '"v1"'},
+            )
+
+    assert asyncio.run(run()) is None
+    assert not [record for record in caplog.records if record.levelname == "WARNING"]
+
+
+def test_scrape_skips_oversized_html_without_content_length(monkeypatch):
+    """Test that a chunked HTML body is dropped once it passes the size limit."""
+    monkeypatch.setattr(scraper, "SCRAPE_MAX_BYTES", 1024)
+
+    async def body():
+        for _ in range(64):
+            yield b"<p>" + b"a" * 256 + b"</p>"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=body())
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as client:
+            return await scrape(
+                "https://www.comvest.unicamp.br/",
+                client=client,
+                strategy=CrawlStrategy.STATIC,
+            )
+
+    assert asyncio.run(run()) == []
+
+
+def test_scrape_reuses_bodies_read_while_crawling(monkeypatch):
+    """Test that crawled PDFs and unsupported pages aren't requested again."""
+    calls = []
+
+    async def extract_pdf_text(pdf_bytes, url):
+        return pdf_bytes.decode(), None
+
+    monkeypatch.setattr(scraper, "extract_pdf_text", extract_pdf_text)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/edital.pdf":
+            return httpx.Response(
+                200, headers={"content-type": "application/pdf"}, content=b"Edital 2026"
+            )
+        if request.url.path == "/logo.png":
+            return httpx.Response(200, headers={"content-type": "image/png"}, content=b"")
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/html"},
+            html='<a href="/edital.pdf">edital</a><a href="/logo.png">logo</a>',
+        )
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as client:
+            return await scrape("https://www.comvest.unicamp.br/", client=client)
+
+    results = asyncio.run(run())
+
+    assert sorted(calls) == ["/", "/edital.pdf", "/logo.png"]
+    assert [result.title for result in results if result.text == "Edital 2026"] == [
+        "edital"
+    ]
+
+
+def test_html_parsers_agree_on_text_title_and_links(monkeypatch):
+    """Test that selectolax and BeautifulSoup give the same results, in any charset."""
+    html = (
+        "<html><head><title>Inscrições</title><script>var x = 1;</script></head>"
+        "<body><nav><a href='/menu'>menu</a></nav>"
+        "<p>Período de inscrição</p><a href='/edital.pdf'>edital</a></body></html>"
+    )
+    results = []
+    for use_selectolax in (True, False):
+        monkeypatch.setattr(scraper, "USE_SELECTOLAX", use_selectolax)
+        for encoding in ("utf-8", "iso-8859-1"):
+            response = httpx.Response(
+                200,
+                headers={"content-type": f"text/html; charset={encoding}"},
+                request=httpx.Request("GET", "https://www.comvest.unicamp.br/"),
+            )
+            result = asyncio.run(
+                scraper.scrape_html(
+                    "https://www.comvest.unicamp.br/", response, html.encode(encoding)
+                )
+            )
+            crawler = URLCrawler("https://www.comvest.unicamp.br/")
+            links = crawler._extract_links(
+                html.encode(encoding), "https://www.comvest.unicamp.br/", encoding
+            )
+            assert result is not None
+            results.append((result.title, result.text, links))
+
+    assert results == [
+        (
+            "Inscrições",
+            "Inscrições Período de inscrição edital",
+            [
+                "https://www.comvest.unicamp.br/menu",
+                "https://www.comvest.unicamp.br/edital.pdf",
+            ],
+        )
+    ] * 4
+
+
+def _pdf(text: str, title: str) -> bytes:
+    """Build a one-page PDF showing text, with title in its metadata."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        f"<< /Title ({title}) >>".encode(),
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R /Info 6 0 R >>\n" % (len(objects) + 1)
+    return pdf + b"startxref\n%d\n%%%%EOF\n" % xref
+
+
+def test_pdf_readers_agree_on_text_and_title(monkeypatch):
+    """Test that PDFium and pypdf extract the same text and metadata title."""
+    pdf = _pdf("Edital   do Vestibular 2026", "Edital Comvest")
+    results = []
+    for use_pdfium in (True, False):
+        monkeypatch.setattr(scraper, "USE_PDFIUM", use_pdfium)
+        results.append(
+            scraper._extract_pdf_text_sync(pdf, "https://www.comvest.unicamp.br/e.pdf")
+        )
+
+    assert results == [("Edital do Vestibular 2026", "Edital Comvest")] * 2
@@ -0,0 +1,48 @@
+"""Tests for the semantic response cache."""
+
+from app.services.semantic_cache import SemanticResponseCache
+
+
+def test_semantic_cache_matches_similar_vectors_only():
+    """Test that a near-identical embedding hits and an unrelated one misses."""
+    cache = SemanticResponseCache(size=4, threshold=0.95, ttl=60)
+    events = [{"type": "text-delta", "id": "text-1", "delta": "Até agosto."}]
+    cache.add([1.0, 0.0, 0.0], 1, events)
+
+    assert cache.get([0.99, 0.05, 0.0], 1) is events
+    assert cache.get([0.0, 1.0, 0.0], 1) is None
+
+
+def test_semantic_cache_overwrites_oldest_when_full():
+    """Test that the oldest entry is replaced once the cache is full."""
+    cache = SemanticResponseCache(size=2, threshold=0.95, ttl=60)
+    cache.add([1.0, 0.0], 1, [{"type": "a"}])
+    cache.add([0.0, 1.0], 1, [{"type": "b"}])
+    cache.add([-1.0, 0.0], 1, [{"type": "c"}])
+
+    assert cache.get([1.0, 0.0], 1) is None
+    assert cache.get([0.0, 1.0], 1) == [{"type": "b"}]
+    assert cache.get([-1.0, 0.0], 1) == [{"type": "c"}]
+
+
+def test_semantic_cache_expires_and_clears_entries():
+    """Test that entries past the TTL and entries removed by clear() miss."""
+    expiring = SemanticResponseCache(size=2, threshold=0.95, ttl=0)
+    expiring.add([1.0, 0.0], 1, [{"type": "a"}])
+    assert expiring.get([1.0, 0.0], 1) is None
+
+    cache = SemanticResponseCache(size=2, threshold=0.95, ttl=60)
+    cache.add([1.0, 0.0], 1, [{"type": "a"}])
+    cache.clear()
+    assert cache.get([1.0, 0.0], 1) is None
+
+
+def test_semantic_cache_serves_entries_only_within_their_scope():
+    """Test that one user's answer is never replayed to another user."""
+    cache = SemanticResponseCache(size=4, threshold=0.95, ttl=60)
+    cache.add([1.0, 0.0], 1, [{"type": "a"}])
+    cache.add([0.99, 0.05], 2, [{"type": "b"}])
+
+    assert cache.get([1.0, 0.0], 1) == [{"type": "a"}]
+    assert cache.get([1.0, 0.0], 2) == [{"type": "b"}]
+    assert cache.get([1.0, 0.0], 3) is None
@@ -0,0 +1,315 @@
+"""Tests for chat message conversion, SSE streaming and the response caches."""
+
+import threading
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi import BackgroundTasks
+
+from app.schemas.ai import ClientMessage, ClientMessagePart
+from app.utils.ai import (
+    clear_response_caches,
+    convert_history_to_openai_messages,
+    convert_to_openai_messages,
+    encode_event,
+    format_sse,
+    invalidate_converted_messages,
+    stream_text,
+    stream_text_with_persistence,
+)
+
+
+@pytest.fixture(autouse=True)
+def _empty_response_caches():
+    """Start every test without answers cached by another one."""
+    clear_response_caches()
+    yield
+    clear_response_caches()
+
+
+def _text_message(role: str, text: str) -> dict:
+    return {"role": role, "parts": [{"type": "text", "text": text}]}
+
+
+def test_encode_event_text_delta_matches_format_sse():
+    """Test that the text-delta fast path produces the same frame as format_sse."""
+    event = {"type": "text-delta", "id": "text-1", "delta": 'aspas " e acentuação'}
+    assert encode_event(event) == format_sse(event)
+
+
+def _fake_openai_client(deltas: list[str], calls: list | None = None) -> SimpleNamespace:
+    def create(**kwargs):
+        if calls is not None:
+            calls.append(kwargs)
+        for delta in deltas:
+            yield SimpleNamespace(
+                choices=[
+                    SimpleNamespace(
+                        finish_reason=None,
+                        delta=SimpleNamespace(content=delta, tool_calls=None),
+                    )
+                ],
+                usage=None,
+            )
+        yield SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    finish_reason="stop",
+                    delta=SimpleNamespace(content=None, tool_calls=None),
+                )
+            ],
+            usage=None,
+        )
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_convert_history_only_converts_new_tail():
+    """Test that a second turn reuses the earlier conversion and adds only the tail."""
+    chat_id = "test-convert-history"
+    history = [_text_message("user", "oi"), _text_message("assistant", "olá")]
+
+    tail, converted = convert_history_to_openai_messages(chat_id, history)
+    assert len(tail) == 2
+    assert [m["content"] for m in converted] == ["oi", "olá"]
+
+    history.append(_text_message("user", "datas?"))
+    tail, converted = convert_history_to_openai_messages(chat_id, history)
+    assert [m.content for m in tail] == ["datas?"]
+    assert [m["content"] for m in converted] == ["oi", "olá", "datas?"]
+
+    invalidate_converted_messages(chat_id)
+    tail, _ = convert_history_to_openai_messages(chat_id, history)
+    assert len(tail) == 3
+    invalidate_converted_messages(chat_id)
+
+
+def test_format_sse_emits_compact_utf8_frame():
+    """Test that SSE frames are compact JSON bytes with non-ASCII kept as UTF-8."""
+    frame = format_sse({"type": "text-delta", "delta": "Olá"})
+    assert frame == 'data: {"type":"text-delta","delta":"Olá"}\n\n'.encode()
+
+
+def test_stream_with_persistence_saves_assistant_reply():
+    """Test that the streamed deltas are saved as the assistant message after [DONE]."""
+    background_tasks = BackgroundTasks()
+    user_message = _text_message("user", "datas?")
+
+    frames = list(
+        stream_text_with_persistence(
+            _fake_openai_client(["As inscrições ", "vão até agosto."]),
+            [],
+            [],
+            {},
+            "gpt-test",
+            "data",
+            [user_message],
+            "chat-1",
+            1,
+            background_tasks,
+        )
+    )
+
+    assert frames[-1] == b"data: [DONE]\n\n"
+    (task,) = background_tasks.tasks
+    chat_id, user_id, saved = task.args
+    assert (chat_id, user_id) == ("chat-1", 1)
+    assert saved[0] == user_message
+    assert saved[1]["role"] == "assistant"
+    assert saved[1]["parts"] == [
+        {"type": "text", "text": "As inscrições vão até agosto."}
+    ]
+
+
+def test_stream_text_replays_cached_response():
+    """Test that an identical prompt is answered from the cache with a new message id."""
+    calls: list = []
+    client = _fake_openai_client(["Até 2 de agosto."], calls)
+    messages = [{"role": "user", "content": "Até quando vão as inscrições?"}]
+
+    first = list(stream_text(client, messages, [], {}, "gpt-test"))
+    second = list(stream_text(client, messages, [], {}, "gpt-test"))
+
+    assert len(calls) == 1
+    assert first[0] != second[0]  # fresh messageId
+    assert first[1:] == second[1:]
+
+
+def test_convert_to_openai_messages_maps_each_part_type():
+    """Test that text, file and tool parts become content, tool calls and tool results."""
+    message = ClientMessage(
+        role="assistant",
+        parts=[
+            ClientMessagePart(type="text", text="Veja:"),
+            ClientMessagePart(type="file", url="https://x/a.png", contentType="image/png"),
+            ClientMessagePart(type="file", url="https://x/edital.pdf"),
+            ClientMessagePart(
+                type="tool-buscar", toolCallId="call-1", state="input-available", input={"q": "datas"}
+            ),
+            ClientMessagePart(
+                type="tool-buscar", toolCallId="call-1", state="output-available", output=["1/8"]
+            ),
+        ],
+    )
+
+    assistant, tool_result = convert_to_openai_messages([message])
+
+    assert assistant["content"] == [
+        {"type": "text", "text": "Veja:"},
+        {"type": "image_url", "image_url": {"url": "https://x/a.png"}},
+        {"type": "text", "text": "https://x/edital.pdf"},
+    ]
+    assert assistant["tool_calls"] == [
+        {
+            "id": "call-1",
+            "type": "function",
+            "function": {"name": "buscar", "arguments": '{"q":"datas"}'},
+        }
+    ]
+    assert tool_result == {"role": "tool", "tool_call_id": "call-1", "content": '["1/8"]'}
+
+
+def test_stream_text_assembles_streamed_tool_call():
+    """Test that tool-call deltas are joined, parsed and the tool's output streamed."""
+
+    def tool_delta(index, id=None, name=None, arguments=None):
+        return SimpleNamespace(
+            index=index,
+            id=id,
+            function=SimpleNamespace(name=name, arguments=arguments),
+        )
+
+    def chunk(tool_calls=None, finish_reason=None):
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    finish_reason=finish_reason,
+                    delta=SimpleNamespace(content=None, tool_calls=tool_calls),
+                )
+            ],
+            usage=None,
+        )
+
+    def create(**kwargs):
+        yield chunk([tool_delta(0, id="call-1", name="buscar", arguments='{"q":')])
+        yield chunk([tool_delta(0, arguments=' "datas"}')])
+        yield chunk(finish_reason="tool_calls")
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    frames = list(
+        stream_text(
+            client,
+            [{"role": "user", "content": "Quais as datas?"}],
+            [],
+            {"buscar": lambda q: f"resultado para {q}"},
+            "gpt-test",
+        )
+    )
+    events = [orjson.loads(frame[6:]) for frame in frames[:-1]]
+
+    assert [event["type"] for event in events] == [
+        "start",
+        "tool-input-start",
+        "tool-input-delta",
+        "tool-input-delta",
+        "tool-input-available",
+        "tool-output-available",
+        "finish",
+    ]
+    assert events[4]["input"] == {"q": "datas"}
+    assert events[5]["output"] == "resultado para datas"
+
+
+def test_stream_with_persistence_saves_replayed_reply():
+    """Test that an answer replayed from the response cache is still persisted."""
+    messages = [{"role": "user", "content": "Qual o valor da taxa?"}]
+    saved_texts = []
+
+    for _ in range(2):
+        background_tasks = BackgroundTasks()
+        list(
+            stream_text_with_persistence(
+                _fake_openai_client(["R$ 200."]),
+                messages,
+                [],
+                {},
+                "gpt-test",
+                "data",
+                [],
+                "chat-2",
+                1,
+                background_tasks,
+            )
+        )
+        (task,) = background_tasks.tasks
+        saved_texts.append(task.args[2][-1]["parts"][0]["text"])
+
+    assert saved_texts == ["R$ 200.", "R$ 200."]
+
+
+def _fake_embed_query(query: str) -> list[float]:
+    # Paraphrases of the deadline question share a direction
+    return [1.0, 0.0] if "inscrições" in query else [0.0, 1.0]
+
+
+def test_stream_text_replays_paraphrase_only_to_the_same_user(monkeypatch):
+    """Test that a reworded lone question hits the semantic cache per user."""
+    monkeypatch.setattr("app.utils.ai.embed_query", _fake_embed_query)
+    calls: list = []
+    client = _fake_openai_client(["Até 2 de agosto."], calls)
+
+    def ask(question: str, user_id: int) -> list[bytes]:
+        messages = [{"role": "user", "content": question}]
+        return list(
+            stream_text(
+                client,
+                messages,
+                [],
+                {},
+                "gpt-test",
+                cache_query=question,
+                user_id=user_id,
+            )
+        )
+
+    first = ask("Até quando vão as inscrições?", 1)
+    reworded = ask("Qual o prazo das inscrições?", 1)
+    assert len(calls) == 1
+    assert first[1:] == reworded[1:]
+
+    ask("Qual o prazo das inscrições?", 2)
+    assert len(calls) == 2
+
+
+def test_stream_text_skips_semantic_cache_when_embedding_is_slow(monkeypatch):
+    """Test that a slow question embedding sends the request to the model."""
+    release = threading.Event()
+
+    def slow_embed_query(query: str) -> list[float]:
+        release.wait(5)
+        return _fake_embed_query(query)
+
+    monkeypatch.setattr("app.utils.ai.embed_query", slow_embed_query)
+    monkeypatch.setattr("app.utils.ai.SEMANTIC_CACHE_EMBED_TIMEOUT", 0.01)
+    calls: list = []
+    client = _fake_openai_client(["Até 2 de agosto."], calls)
+    messages = [{"role": "user", "content": "Até quando vão as inscrições?"}]
+
+    try:
+        events = list(
+            stream_text(
+                client,
+                messages,
+                [],
+                {},
+                "gpt-test",
+                cache_query="Até quando vão as inscrições?",
+                user_id=1,
+            )
+        )
+    finally:
+        release.set()
+
+    assert len(calls) == 1
+    assert events[-1] == b"data: [DONE]\n\n"
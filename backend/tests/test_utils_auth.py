@@ -0,0 +1,27 @@
+"""Tests for JWT helpers."""
+
+import pytest
+from fastapi import HTTPException
+
+from app.config.settings import Settings
+from app.utils.auth import create_jwt, verify_jwt
+
+
+def test_jwt_round_trip():
+    """Test that a created token verifies and carries the subject and expiry."""
+    settings = Settings(JWT_SECRET="test-secret")
+
+    token = create_jwt(settings, "42", "HS256", 5)
+    payload = verify_jwt(settings, token, "HS256")
+
+    assert payload["sub"] == "42"
+    assert payload["exp"] - payload["iat"] == 5 * 60
+
+
+def test_jwt_signed_with_other_secret_is_rejected():
+    """Test that a token signed with another secret raises 401."""
+    token = create_jwt(Settings(JWT_SECRET="other-secret"), "42", "HS256", 5)
+
+    with pytest.raises(HTTPException) as exc_info:
+        verify_jwt(Settings(JWT_SECRET="test-secret"), token, "HS256")
+    assert exc_info.value.status_code == 401